@@ -3,9 +3,126 @@ Cached research with quality validation and conversation threading support
 Only caches complete, successful results
 """
 
-from agent.research_agent import research as original_research
+from agent.research_agent import OPENAI_API_KEY, research as original_research
 from database.supabase_client_v2 import get_database_v2
+from utils.query_key import MIN_CACHE_TTL, cache_key
+from utils.retry import with_retry
+from openai import OpenAI
+from collections import ChainMap
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Dict, Optional, List, Any
+from datetime import datetime, timezone
+import atexit
+import logging
+import re
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Semantic cache settings
+EMBEDDING_MODEL = "text-embedding-3-small"
+SEMANTIC_CACHE_THRESHOLD = 0.92
+
+_openai_client = OpenAI(api_key=OPENAI_API_KEY, max_retries=0)  # Retries are handled by with_retry
+
+# Session saves run off the request path; shutdown waits for in-flight writes
+_SAVE_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="session-save")
+atexit.register(_SAVE_POOL.shutdown)
+
+# Markers LangChain/the agent put on incomplete output (at the head or tail)
+_BAD_MARKERS = re.compile(r'stopped due to|research failed', re.IGNORECASE)
+
+
+def _is_fresh(created_at: Optional[str], ttl: int) -> bool:
+    """Check a cached row's created_at against the TTL (missing or unparseable = stale)"""
+    if not created_at:
+        return False
+    try:
+        created = datetime.fromisoformat(created_at)
+    except ValueError:
+        return False
+    now = datetime.now(timezone.utc) if created.tzinfo else datetime.now()
+    return (now - created).total_seconds() <= ttl
+
+
+def _embed_query(query: str) -> Optional[List[float]]:
+    """Embed query for semantic cache lookup (None on failure)"""
+    try:
+        response = with_retry(_openai_client.embeddings.create)(
+            model=EMBEDDING_MODEL,
+            input=query
+        )
+        return response.data[0].embedding
+    except Exception as e:
+        logger.warning("⚠️ Query embedding failed: %s", e)
+        return None
+
+
+def _is_valid_report(report: str) -> bool:
+    """Report is usable (cacheable) only if complete"""
+    return (
+        bool(report) and len(report) > 100
+        and not _BAD_MARKERS.search(report[:500])
+        and not _BAD_MARKERS.search(report[-500:])
+    )
+
+
+def _from_cache(cached_result: Dict[str, Any]) -> Dict[str, Any]:
+    """Build research result from a cached session"""
+    cached_metadata = cached_result.get('metadata') or {}
+    overrides = {
+        'from_cache': True,
+        'cache_saved_cost': cached_metadata.get('estimated_cost', 0.025),
+        'estimated_cost': 0,
+        'iterations': 0,
+        'session_id': cached_result.get('id')  # Include session ID from cache
+    }
+    
+    return {
+        'output': cached_result.get('report', ''),
+        'intermediate_steps': [],
+        'citations': cached_result.get('citations', []),
+        # Overrides win; flattened to a plain dict so callers can still mutate it
+        'metadata': dict(ChainMap(overrides, cached_metadata))
+    }
+
+
+def _save_in_background(
+    db: Any,
+    session_id: str,
+    query: str,
+    report: str,
+    citations: List[Dict[str, Any]],
+    metadata: Dict[str, Any],
+    query_embedding: Optional[List[float]],
+    window: Optional[str],
+    params: List[str]
+) -> Optional[str]:
+    """Persist a completed research session (runs on _SAVE_POOL)"""
+    if query_embedding is None:
+        query_embedding = _embed_query(query)
+    
+    return db.save_session(
+        query=query,
+        report=report,
+        citations=citations,
+        metadata=metadata,
+        embedding=query_embedding,
+        window=window,
+        params=params,
+        session_id=session_id
+    )
+
+
+def _log_save_result(future: Future) -> None:
+    """Report the outcome of a background session save"""
+    error = future.exception()
+    if error:
+        logger.warning("⚠️ Save failed: %s", error)
+    elif future.result():
+        logger.info("✅ Saved complete result: %.8s", future.result())
+    else:
+        logger.warning("⚠️ Save skipped - session not persisted")
 
 
 def cached_research(
@@ -18,39 +135,54 @@ def cached_research(
     """Research with smart caching (only caches successful results)"""
     
     db = get_database_v2()
+    query_embedding: Optional[List[float]] = None
+    normalized_text, window, params, ttl = cache_key(query)
+    
+    if ttl < MIN_CACHE_TTL:
+        logger.info("⏱️ Time-sensitive query - bypassing cache")
+        use_cache = False
     
     # Check cache
     if db and use_cache:
         try:
-            cached_result = db.check_cache(query)
+            cached_result = db.check_cache(
+                normalized_text,
+                window=window,
+                params=params,
+                max_age_seconds=ttl
+            )
             
             if cached_result:
                 # CRITICAL: Validate cached result has actual content
-                report = cached_result.get('report', '')
-                
-                # Don't use cache if report is incomplete
-                if report and len(report) > 100 and 'stopped due to' not in report.lower():
-                    print("✅ CACHE HIT - Valid result")
-                    return {
-                        'output': report,
-                        'intermediate_steps': [],
-                        'citations': cached_result.get('citations', []),
-                        'metadata': {
-                            **cached_result.get('metadata', {}),
-                            'from_cache': True,
-                            'cache_saved_cost': cached_result.get('metadata', {}).get('estimated_cost', 0.025),
-                            'estimated_cost': 0,
-                            'iterations': 0,
-                            'session_id': cached_result.get('id')  # Include session ID from cache
-                        }
-                    }
+                if _is_valid_report(cached_result.get('report', '')):
+                    logger.info("✅ CACHE HIT - Valid result")
+                    return _from_cache(cached_result)
                 else:
-                    print("⚠️ Cache HIT but result incomplete - re-researching...")
+                    logger.warning("⚠️ Cache HIT but result incomplete - re-researching...")
+            
+            # Exact miss - try semantic tier (paraphrases of stored queries)
+            query_embedding = _embed_query(query)
+            if query_embedding:
+                similar_result = db.semantic_check_cache(
+                    query_embedding,
+                    threshold=SEMANTIC_CACHE_THRESHOLD
+                )
+                # Embeddings collapse dates/numbers - require the same window and params
+                similar_meta = (similar_result or {}).get('metadata') or {}
+                if (
+                    similar_result
+                    and _is_valid_report(similar_result.get('report', ''))
+                    and similar_meta.get('cache_window') == window
+                    and similar_meta.get('cache_params', []) == params
+                    and _is_fresh(similar_result.get('created_at'), ttl)
+                ):
+                    logger.info("✅ SEMANTIC CACHE HIT - Valid result")
+                    return _from_cache(similar_result)
         except Exception as e:
-            print(f"⚠️ Cache check failed: {e}")
+            logger.warning("⚠️ Cache check failed: %s", e)
     
     # Perform research
-    print("🔍 Researching...")
+    logger.info("🔍 Researching...")
     result = original_research(query, callbacks=callbacks, **kwargs)
     
     # CRITICAL: Only save if result is complete, valid, AND save_to_db is True
@@ -58,32 +190,39 @@ def cached_research(
         output = result.get('output', '')
         
         # Validate result quality before saving
-        is_complete = (
-            len(output) > 100 and
-            'stopped due to' not in output.lower() and
-            'research failed' not in output.lower()
-        )
-        
-        if is_complete:
+        if _is_valid_report(output):
             try:
-                session_id = db.save_session(
-                    query=query,
-                    report=output,
-                    citations=result.get('citations', []),
-                    metadata=result.get('metadata', {})
+                result['metadata']['cache_window'] = window
+                result['metadata']['cache_params'] = params
+                
+                # Pre-generate the ID so the response doesn't wait on the insert
+                session_id = str(uuid.uuid4())
+                future = _SAVE_POOL.submit(
+                    _save_in_background,
+                    db,
+                    session_id,
+                    query,
+                    output,
+                    result.get('citations', []),
+                    dict(result.get('metadata', {})),
+                    query_embedding,
+                    window,
+                    params
                 )
-                if session_id:
-                    result['metadata']['saved_to_db'] = True
-                    result['metadata']['session_id'] = session_id  # Add session ID to metadata
-                    print(f"✅ Saved complete result: {session_id[:8]}")
+                future.add_done_callback(_log_save_result)
+                
+                # Not saved yet: session_id only exists once the background save
+                # succeeds (failures are logged by _log_save_result)
+                result['metadata']['save_pending'] = True
+                result['metadata']['session_id'] = session_id
             except Exception as e:
-                print(f"⚠️ Save failed: {e}")
+                logger.warning("⚠️ Save failed: %s", e)
         else:
-            print("⚠️ Result incomplete - not caching")
+            logger.warning("⚠️ Result incomplete - not caching")
             result['metadata']['saved_to_db'] = False
     elif not save_to_db:
         # Follow-up query - don't save to database
-        print("📝 Follow-up query - skipping database save")
+        logger.info("📝 Follow-up query - skipping database save")
         result['metadata']['saved_to_db'] = False
     
     return result
\ No newline at end of file
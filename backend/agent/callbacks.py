@@ -5,6 +5,11 @@ Custom callbacks for displaying agent reasoning in Streamlit
 from typing import Any, Dict, List, Optional
 from langchain.callbacks.base import BaseCallbackHandler
 import streamlit as st
+import time
+
+RENDER_INTERVAL = 0.05  # Seconds between observation re-renders
+MAX_LOG_CHARS = 4096  # The thought sits at the head of the scratchpad log
+MAX_INPUT_CHARS = 1024
 
 
 class StreamlitCallbackHandler(BaseCallbackHandler):
@@ -24,6 +29,9 @@ class StreamlitCallbackHandler(BaseCallbackHandler):
         self.container = container
         self.steps: List[Dict[str, Any]] = []
         self.current_step: Dict[str, Any] = {}
+        self._placeholders: List[Any] = []  # One st.empty() slot per step
+        self._last_render_ts = 0.0
+        self._pending_render = False
     
     def on_agent_action(self, action: Any, **kwargs: Any) -> None:
         """
@@ -36,21 +44,30 @@ class StreamlitCallbackHandler(BaseCallbackHandler):
         # Extract thought from log
         thought = ""
         if hasattr(action, 'log'):
-            log_parts = str(action.log).split('Action:')
-            if len(log_parts) > 0:
-                thought = log_parts[0].replace('Thought:', '').strip()
+            log = action.log if isinstance(action.log, str) else str(action.log)
+            thought = log[:MAX_LOG_CHARS].split('Action:', 1)[0].replace('Thought:', '', 1).strip()
+        
+        tool_input = ''
+        if hasattr(action, 'tool_input'):
+            raw_input = action.tool_input
+            tool_input = (raw_input if isinstance(raw_input, str) else str(raw_input))[:MAX_INPUT_CHARS]
         
         # Create new step
         self.current_step = {
             'type': 'action',
             'thought': thought or 'Planning next action...',
             'tool': str(action.tool) if hasattr(action, 'tool') else 'unknown',
-            'input': str(action.tool_input) if hasattr(action, 'tool_input') else '',
+            'input': tool_input,
             'observation': None
         }
         
         self.steps.append(self.current_step)
-        self._render()
+        
+        # Collapse the previous step, then draw only the new one
+        if self._placeholders:
+            self._render_step(len(self.steps) - 2, expanded=False)
+        self._placeholders.append(self.container.empty())
+        self._render_step(len(self.steps) - 1, expanded=True)
     
     def on_tool_start(
         self,
@@ -71,10 +88,11 @@ class StreamlitCallbackHandler(BaseCallbackHandler):
         """
         if self.current_step:
             # Truncate long observations
+            output = output if isinstance(output, str) else str(output)
             truncated_output = output[:500] + "..." if len(output) > 500 else output
             self.current_step['observation'] = truncated_output
         
-        self._render()
+        self._render_latest()
     
     def on_tool_error(self, error: Exception, **kwargs: Any) -> None:
         """
@@ -86,7 +104,7 @@ class StreamlitCallbackHandler(BaseCallbackHandler):
         """
         if self.current_step:
             self.current_step['observation'] = f"❌ Error: {str(error)}"
-        self._render()
+        self._render_latest()
     
     def on_agent_finish(self, finish: Any, **kwargs: Any) -> None:
         """
@@ -96,48 +114,66 @@ class StreamlitCallbackHandler(BaseCallbackHandler):
             finish: AgentFinish object
             **kwargs: Additional arguments
         """
-        pass
+        # Flush an observation update skipped by the throttle
+        if self._pending_render:
+            self._render_step(len(self.steps) - 1, expanded=True)
     
-    def _render(self) -> None:
-        """Render all steps in Streamlit"""
-        with self.container:
-            for i, step in enumerate(self.steps):
-                # Determine emoji and title based on tool
-                tool = step.get('tool', 'unknown')
-                
-                if tool == 'search_web':
-                    emoji = "🔍"
-                    action_name = "Web Search"
-                elif tool == 'scrape_webpage':
-                    emoji = "🌐"
-                    action_name = "Scrape Article"
-                else:
-                    emoji = "🔧"
-                    action_name = tool
+    def _render_latest(self) -> None:
+        """Re-render the current step, throttled to RENDER_INTERVAL"""
+        if not self._placeholders:
+            return
+        if time.monotonic() - self._last_render_ts < RENDER_INTERVAL:
+            self._pending_render = True
+            return
+        self._render_step(len(self.steps) - 1, expanded=True)
+    
+    def _render_step(self, i: int, expanded: bool) -> None:
+        """Render a single step into its own placeholder"""
+        step = self.steps[i]
+        
+        # Determine emoji and title based on tool
+        tool = step.get('tool', 'unknown')
+        
+        if tool == 'search_web':
+            emoji = "🔍"
+            action_name = "Web Search"
+        elif tool == 'scrape_webpage':
+            emoji = "🌐"
+            action_name = "Scrape Article"
+        elif tool == 'scrape_webpages':
+            emoji = "🌐"
+            action_name = "Scrape Articles"
+        else:
+            emoji = "🔧"
+            action_name = tool
+        
+        thought = step.get('thought', 'Processing...')
+        thought_preview = thought[:60] + "..." if len(thought) > 60 else thought
+        
+        # container() replaces whatever the slot showed before
+        with self._placeholders[i].container():
+            with st.expander(
+                f"{emoji} Step {i+1}: {thought_preview}",
+                expanded=expanded  # Expand last step
+            ):
+                # Show thought
+                st.markdown("**💭 Thought:**")
+                st.info(thought)
                 
-                thought = step.get('thought', 'Processing...')
-                thought_preview = thought[:60] + "..." if len(thought) > 60 else thought
+                # Show action
+                st.markdown(f"**⚡ Action:** `{action_name}`")
+                tool_input = step.get('input', 'N/A')
+                st.code(tool_input, language='text')
                 
-                # Create expander for each step
-                with st.expander(
-                    f"{emoji} Step {i+1}: {thought_preview}",
-                    expanded=(i == len(self.steps) - 1)  # Expand last step
-                ):
-                    # Show thought
-                    st.markdown("**💭 Thought:**")
-                    st.info(thought)
-                    
-                    # Show action
-                    st.markdown(f"**⚡ Action:** `{action_name}`")
-                    tool_input = step.get('input', 'N/A')
-                    st.code(tool_input, language='text')
+                # Show observation if available
+                observation = step.get('observation')
+                if observation:
+                    st.markdown("**👁️ Observation:**")
                     
-                    # Show observation if available
-                    observation = step.get('observation')
-                    if observation:
-                        st.markdown("**👁️ Observation:**")
-                        
-                        if observation.startswith('❌'):
-                            st.error(observation)
-                        else:
-                            st.success(observation)
\ No newline at end of file
+                    if observation.startswith('❌'):
+                        st.error(observation)
+                    else:
+                        st.success(observation)
+        
+        self._last_render_ts = time.monotonic()
+        self._pending_render = False
\ No newline at end of file
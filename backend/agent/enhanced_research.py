@@ -2,9 +2,57 @@
 """Enhanced research with query decomposition"""
 
 from .cached_research_agent import cached_research
+from .research_agent import OPENAI_API_KEY
 from langchain_openai import ChatOpenAI
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from typing import List, Dict, Any
-import os
+import io
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# Static instructions first, variable content last - keeps the prompt prefix
+# byte-identical across calls so OpenAI's automatic prompt cache can hit
+DECOMPOSITION_PROMPT = """You are a research planner. Break the query below into 3-4 focused sub-questions.
+
+Rules:
+- Each sub-question covers a different aspect of the query
+- Each sub-question must be answerable on its own with a web search
+- Return one sub-question per line, numbered (1., 2., ...)
+- No preamble or commentary
+
+Query: """
+
+# Leading "1." / "2)" / "-" / "*" list markers on decomposition output
+_SUBQ_PREFIX = re.compile(r'^\s*(?:\d+[.)]?\s*|[-*]\s*)')
+
+# Analytical phrasing that warrants decomposition (prefix match: analyzes, compared)
+_COMPLEX_RE = re.compile(
+    r'\b(analyze|evaluate|implications|comprehensive|compare|contrast|assess|examine)',
+    re.IGNORECASE
+)
+
+SYNTHESIS_PROMPT = """Synthesize the sub-question research below into one comprehensive report.
+
+Task:
+- Directly answer the original query
+- Merge overlapping findings and keep a logical flow
+- Preserve all [Source: URL] citations from the research
+- Use clear section headers
+
+"""
+
+
+@lru_cache(maxsize=4)
+def _llm(model: str) -> ChatOpenAI:
+    """Shared LLM client per model"""
+    return ChatOpenAI(
+        model=model,
+        temperature=0,
+        api_key=OPENAI_API_KEY
+    )
 
 
 def research_with_decomposition(
@@ -15,49 +63,38 @@ def research_with_decomposition(
     """Enhanced research with automatic decomposition"""
     
     word_count = len(query.split())
-    complex_keywords = [
-        'analyze', 'evaluate', 'implications', 'comprehensive',
-        'compare', 'contrast', 'assess', 'examine'
-    ]
-    
-    is_complex = word_count > 15 or any(kw in query.lower() for kw in complex_keywords)
+    is_complex = word_count > 15 or bool(_COMPLEX_RE.search(query))
     
     if not is_complex or not auto_decompose:
         return cached_research(query, **kwargs)
     
-    print(f"🧠 Complex query ({word_count} words). Decomposing...")
+    logger.info("🧠 Complex query (%d words). Decomposing...", word_count)
     
-    # Decompose - FIXED: api_key parameter
-    llm = ChatOpenAI(
-        model="gpt-4o-mini",
-        temperature=0,
-        api_key=os.getenv("OPENAI_API_KEY")  # FIXED
-    )
-    
-    prompt = f"""Break this into 3-4 sub-questions:
-
-Query: {query}
-
-Sub-questions:"""
+    # Decompose
+    response = _llm("gpt-4o-mini").invoke(DECOMPOSITION_PROMPT + query)
     
-    response = llm.invoke(prompt)
+    cleaned_lines = (_SUBQ_PREFIX.sub('', line).strip() for line in str(response.content).splitlines())
+    sub_queries: List[str] = [line for line in cleaned_lines if len(line) > 10][:4]
     
-    lines = str(response.content).strip().split('\n')
-    sub_queries: List[str] = []
-    
-    for line in lines:
-        cleaned = line.strip().lstrip('0123456789.- ')
-        if len(cleaned) > 10:
-            sub_queries.append(cleaned)
+    # Nothing to synthesize across - research the query directly
+    if len(sub_queries) <= 1:
+        return cached_research(query, **kwargs)
     
-    sub_queries = sub_queries[:4]
+    # Research each (independent and I/O-bound - run concurrently)
+    def _run_sub(sub_q: str) -> Dict[str, Any]:
+        return cached_research(sub_q, max_iterations=8, **kwargs)
     
-    # Research each
     sub_results: List[Dict[str, Any]] = []
-    all_citations: List[Dict[str, Any]] = []
+    unique_by_url: Dict[str, Dict[str, Any]] = {}  # Deduplicated as collected
+    
+    with ThreadPoolExecutor(max_workers=min(4, max(1, len(sub_queries)))) as executor:
+        results = list(executor.map(_run_sub, sub_queries))  # map preserves order
     
-    for sub_q in sub_queries:
-        result = cached_research(sub_q, max_iterations=8, **kwargs)
+    for sub_q, result in zip(sub_queries, results):
+        # Failed sub-research only adds noise (and tokens) to synthesis
+        if result.get('error') or len(result.get('output', '')) < 100:
+            logger.warning("⚠️ Skipping failed sub-query: %.60s", sub_q)
+            continue
         
         sub_results.append({
             'query': sub_q,
@@ -67,40 +104,28 @@ Sub-questions:"""
         
         citations_list = result.get('citations', [])
         if isinstance(citations_list, list):
-            all_citations.extend(citations_list)
+            for cite in citations_list:
+                unique_by_url.setdefault(cite.get('url', ''), cite)
+    results.clear()  # sub_results now holds the only report references
     
-    # Synthesize - FIXED: api_key parameter
-    synthesis_llm = ChatOpenAI(
-        model="gpt-4o",
-        temperature=0,
-        api_key=os.getenv("OPENAI_API_KEY")  # FIXED
-    )
-    
-    sub_reports = "\n\n".join([
-        f"### {i+1}. {r['query']}\n{r['report']}"
-        for i, r in enumerate(sub_results)
-    ])
+    if not sub_results:
+        return cached_research(query, **kwargs)
     
-    prompt = f"""Synthesize into comprehensive report.
-
-Original: {query}
-
-Research:
-{sub_reports}
-
-Task: Create comprehensive report."""
+    # Synthesize
+    buf = io.StringIO()
+    for i, r in enumerate(sub_results):
+        buf.write(f"### {i+1}. {r['query']}\n")
+        buf.write(r['report'])
+        buf.write("\n\n")
+        r['report'] = ''  # Release as consumed - not re-read below
+    sub_reports = buf.getvalue()
     
-    synthesis = synthesis_llm.invoke(prompt)
+    prompt = f"{SYNTHESIS_PROMPT}Original query: {query}\n\nResearch:\n{sub_reports}"
     
-    # Deduplicate citations
-    unique_citations: List[Dict[str, Any]] = []
-    seen: set = set()
+    synthesis = _llm("gpt-4o").invoke(prompt)
     
-    for cite in all_citations:
-        url = cite.get('url', '')
-        if url and url not in seen:
-            seen.add(url)
-            unique_citations.append(cite)
+    unique_by_url.pop('', None)  # Citations without a URL
+    unique_citations = list(unique_by_url.values())
     
     return {
         'output': str(synthesis.content),
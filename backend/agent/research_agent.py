@@ -5,35 +5,54 @@ Research agent with fallback synthesis
 from langchain_openai import ChatOpenAI
 from langchain.agents import AgentExecutor, create_react_agent
 from langchain.prompts import PromptTemplate
-from typing import Dict, List, Optional, Any
+from typing import Dict, Iterator, List, Optional, Any
+from itertools import islice
+import logging
 import os
+import re
+import threading
+from functools import lru_cache
 from dotenv import load_dotenv
 
 from tools.search import search_web
-from tools.scraper import scrape_webpage
-from utils.token_tracker import get_tracker
+from tools.scraper import scrape_webpage, scrape_webpages
+from utils.token_tracker import TokenTracker, get_tracker
 from utils.citation_extractor import CitationExtractor
 from langchain.callbacks.base import BaseCallbackHandler
 
 class TokenAndToolHandler(BaseCallbackHandler):
-    def __init__(self):
+    def __init__(self, tracker: TokenTracker):
         self.search_count = 0
         self.scrape_count = 0
-        self.tokens = 0
+        self.tracker = tracker  # This request's usage; get_tracker() keeps the process-wide totals
+        
+    def on_llm_end(self, response, **kwargs):
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        input_tokens = usage.get("prompt_tokens", 0)
+        output_tokens = usage.get("completion_tokens", 0)
+        self.tracker.add_usage(input_tokens, output_tokens)
+        get_tracker().add_usage(input_tokens, output_tokens)
         
     def on_tool_start(self, serialized, input_str, **kwargs):
         if serialized.get("name") == "search_web":
             self.search_count += 1
-        elif serialized.get("name") == "scrape_webpage":
+        elif serialized.get("name") in ("scrape_webpage", "scrape_webpages"):
             self.scrape_count += 1
 
 load_dotenv()
 
+# Resolved once at import; passed explicitly to every client
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
-class ResearchAgent:
-    """Autonomous research agent with fallback synthesis"""
-    
-    REACT_PROMPT = """You are Vettan AI, an expert research assistant.
+logger = logging.getLogger(__name__)
+
+# LangChain appends "Agent stopped due to iteration limit..." at the tail
+_STOPPED_RE = re.compile(r'stopped due to', re.IGNORECASE)
+
+MAX_OBSERVATION_CHARS = 2000  # Same bound the fallback synthesis reads
+
+
+REACT_PROMPT = """You are Vettan AI, an expert research assistant.
 
 TOOLS: {tools}
 TOOL NAMES: {tool_names}
@@ -41,7 +60,7 @@ TOOL NAMES: {tool_names}
 FORMAT:
 Question: the input question
 Thought: your reasoning
-Action: ONLY tool name (search_web OR scrape_webpage)
+Action: ONLY tool name (search_web OR scrape_webpage OR scrape_webpages)
 Action Input: ONLY the input (clean, no extra spaces)
 Observation: tool result
 ... (repeat as needed)
@@ -54,6 +73,32 @@ Begin!
 
 Question: {input}
 Thought: {agent_scratchpad}"""
+
+# Parsed once at import; tools are module-level singletons
+_REACT_PROMPT_TEMPLATE = PromptTemplate.from_template(REACT_PROMPT)
+_TOOLS = [search_web, scrape_webpage, scrape_webpages]
+
+
+def _long_observations(intermediate_steps: List) -> Iterator[str]:
+    """Yield bounded observations with enough content to synthesize from"""
+    for _, observation in intermediate_steps:
+        obs_str = str(observation)
+        if len(obs_str) > 100:
+            yield obs_str[:MAX_OBSERVATION_CHARS]
+
+
+@lru_cache(maxsize=8)
+def _get_llm(model: str) -> ChatOpenAI:
+    """Shared LLM client per model (reuses its HTTP connection pool)"""
+    return ChatOpenAI(
+        model=model,
+        temperature=0,
+        api_key=OPENAI_API_KEY
+    )
+
+
+class ResearchAgent:
+    """Autonomous research agent with fallback synthesis"""
     
     def __init__(
         self,
@@ -65,22 +110,16 @@ Thought: {agent_scratchpad}"""
         self.model = model
         self.max_iterations = max_iterations
         
-        self.llm = ChatOpenAI(
-            model=model,
-            temperature=0,
-            api_key=os.getenv("OPENAI_API_KEY")
-        )
+        self.llm = _get_llm(model)
         
-        self.tools = [search_web, scrape_webpage]
-        self.prompt = PromptTemplate.from_template(self.REACT_PROMPT)
+        self.tools = _TOOLS
+        self.prompt = _REACT_PROMPT_TEMPLATE
         
         self.agent = create_react_agent(
             llm=self.llm,
             tools=self.tools,
             prompt=self.prompt
         )
-        
-        self.tracker = get_tracker()
     
     def research(
         self,
@@ -89,7 +128,7 @@ Thought: {agent_scratchpad}"""
     ) -> Dict[str, Any]:
         """Execute research with fallback synthesis"""
         
-        stats_handler = TokenAndToolHandler()
+        stats_handler = TokenAndToolHandler(TokenTracker(self.model))
         
         
         request_callbacks = [stats_handler]
@@ -114,16 +153,23 @@ Thought: {agent_scratchpad}"""
             intermediate_steps = result.get('intermediate_steps', [])
             
             # FALLBACK: If agent stopped without proper answer, synthesize from gathered data
-            if 'stopped due to' in output.lower() or len(output) < 100:
-                print("Agent incomplete - using fallback synthesis...")
-                output = self._fallback_synthesis(query, intermediate_steps)
+            stopped = bool(_STOPPED_RE.search(output[-500:]))
+            if stopped or len(output) < 100:
+                logger.info("Agent incomplete - using fallback synthesis...")
+                output = self._fallback_synthesis(query, intermediate_steps, callbacks=[stats_handler])
             
             citations = CitationExtractor.extract_from_agent_steps(intermediate_steps)
-            cost_data = self.tracker.get_cost()
+            cost_data = stats_handler.tracker.get_cost()
+            
+            # Callers only need a bounded view of raw observations
+            bounded_steps = [
+                (action, str(observation)[:MAX_OBSERVATION_CHARS])
+                for action, observation in intermediate_steps
+            ]
             
             return {
                 'output': output,
-                'intermediate_steps': intermediate_steps,
+                'intermediate_steps': bounded_steps,
                 'citations': citations,
                 'metadata': {
                     'iterations': len(intermediate_steps),
@@ -132,7 +178,7 @@ Thought: {agent_scratchpad}"""
                     'tokens': cost_data['total_tokens'],
                     'estimated_cost': cost_data['total_cost'],
                     'model': self.model,
-                    'used_fallback': 'stopped due to' in result.get('output', '').lower()
+                    'used_fallback': stopped
                 }
             }
         
@@ -145,25 +191,21 @@ Thought: {agent_scratchpad}"""
                 'error': True
             }
     
-    def _fallback_synthesis(self, query: str, intermediate_steps: List) -> str:
+    def _fallback_synthesis(self, query: str, intermediate_steps: List, callbacks: Optional[List] = None) -> str:
         """
         Emergency synthesis when agent doesn't complete
         Uses gathered data to create answer anyway
         """
-        # Extract all observations
-        observations = []
-        for action, observation in intermediate_steps:
-            obs_str = str(observation)
-            if len(obs_str) > 100:
-                observations.append(obs_str[:2000])
+        # Stop scanning once three usable observations are found
+        observations = list(islice(_long_observations(intermediate_steps), 3))
         
         if not observations:
             return "Unable to complete research. Please try again with more iterations."
         
         
-        sources_text = ""
-        for i, obs in enumerate(observations[:3]):
-            sources_text += f"Source {i+1}:\n{obs}\n\n"
+        sources_text = "".join(
+            f"Source {i+1}:\n{obs}\n\n" for i, obs in enumerate(observations)
+        )
         
         
         synthesis_prompt = f"""Based on the research data gathered, provide a comprehensive answer to this question:
@@ -176,28 +218,28 @@ Research Data Gathered:
 Task: Synthesize this information into a clear, comprehensive answer with citations."""
         
         try:
-            synthesis_llm = ChatOpenAI(
-                model="gpt-4o-mini",
-                temperature=0,
-                api_key=os.getenv("OPENAI_API_KEY")
-            )
-            response = synthesis_llm.invoke(synthesis_prompt)
+            synthesis_llm = _get_llm("gpt-4o-mini")
+            response = synthesis_llm.invoke(synthesis_prompt, config={"callbacks": callbacks or []})
             
             return str(response.content)
         except Exception as e:
-            print(f"❌ Fallback synthesis failed: {e}")
+            logger.error("❌ Fallback synthesis failed: %s", e)
             return "Research data gathered but synthesis failed. Please increase Max Steps."
 
 
-_agent_instance = None
+_agent_lock = threading.Lock()
+
+
+@lru_cache(maxsize=8)
+def _build_agent(model: str, max_iterations: int) -> ResearchAgent:
+    """Build one agent per (model, max_iterations) configuration"""
+    return ResearchAgent(model=model, max_iterations=max_iterations)
 
 
 def get_agent(model: str = "gpt-4o-mini", max_iterations: int = 6) -> ResearchAgent:
-    """Get agent instance"""
-    global _agent_instance
-    if _agent_instance is None:
-        _agent_instance = ResearchAgent(model=model, max_iterations=max_iterations)
-    return _agent_instance
+    """Get agent instance (safe to call from parallel sub-query threads)"""
+    with _agent_lock:
+        return _build_agent(model, max_iterations)
 
 
 def research(query: str, callbacks: Optional[List] = None, **kwargs: Any) -> Dict[str, Any]:
@@ -1,22 +1,116 @@
 
 import os
-import json
+import orjson
 import time
+import atexit
 import asyncio
+import io
+import re
+import base64
+import heapq
+import hashlib
+import functools
 import logging
-from typing import List, Dict, Any, Optional
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple
+from urllib.parse import urlsplit
 
+import httpx
+import tiktoken
+from cachetools import LRUCache, TTLCache
+from diskcache import Cache
 from openai import AsyncOpenAI
-from tavily import TavilyClient
+
+from audio.tts import get_tts
+from utils.query_key import DEFAULT_CACHE_TTL, MIN_CACHE_TTL, cache_key
+from utils.retry import with_retry
+from utils.semantic_cache import SemanticCache
 
 logger = logging.getLogger(__name__)
 
-# Initialize clients once at module level
-openai_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-tavily_client = TavilyClient(api_key=os.getenv("TAVILY_API_KEY"))
+# Initialize clients once at module level (tuned keep-alive pool for fan-out)
+openai_client = AsyncOpenAI(
+    api_key=os.getenv("OPENAI_API_KEY"),
+    max_retries=0,  # Retries are handled by with_retry (backoff + jitter)
+    http_client=httpx.AsyncClient(
+        limits=httpx.Limits(max_keepalive_connections=32, max_connections=64),
+        http2=True,
+        timeout=httpx.Timeout(60.0, connect=10.0)
+    )
+)
+TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
+
+# Streaming synthesis -> TTS
+_SENTENCE_END_RE = re.compile(r'[.!?]\s')
+STREAM_FLUSH_CHARS = 400  # Flush a run this long even without a sentence end
+AUDIO_BATCH_CHARS = 600  # Text per TTS request while streaming (small = earlier first audio)
+_tts_sem = asyncio.Semaphore(4)  # OpenAI TTS rate limits
+
+# Semantic response caches - near-duplicate queries skip the LLM round-trip.
+# Every entry is scoped to the query's time window/parameters (_semantic_scope)
+# and expires with it. Set SEMANTIC_CACHE_DIR to persist them across restarts.
+EMBEDDING_MODEL = "text-embedding-3-small"
+_CACHE_DIR = os.getenv("SEMANTIC_CACHE_DIR")
+decomposition_cache = SemanticCache("decomposition", cache_dir=_CACHE_DIR, ttl=DEFAULT_CACHE_TTL)
+synthesis_cache = SemanticCache("synthesis", cache_dir=_CACHE_DIR, ttl=DEFAULT_CACHE_TTL)  # + source URLs
+followup_cache = SemanticCache("followup", cache_dir=_CACHE_DIR, ttl=DEFAULT_CACHE_TTL)  # + last assistant turn
+
+for _cache in (decomposition_cache, synthesis_cache, followup_cache):
+    atexit.register(_cache.save)
+
+
+@with_retry
+async def _chat(**kwargs: Any) -> Any:
+    """Chat completion with transient-failure retries (30s per attempt)."""
+    return await openai_client.chat.completions.create(timeout=30.0, **kwargs)
+
+
+async def _embed(text: str) -> Optional[List[float]]:
+    """Embed text for semantic cache lookups (None on failure)."""
+    try:
+        response = await with_retry(openai_client.embeddings.create)(model=EMBEDDING_MODEL, input=text)
+        return response.data[0].embedding
+    except Exception as e:
+        logger.warning(f"Embedding failed ({e}), skipping semantic cache")
+        return None
+
+
+async def _query_embedding(query: str, embedding_task: Optional["asyncio.Task[Optional[List[float]]]"]) -> Optional[List[float]]:
+    """Embedding started earlier with asyncio.create_task(_embed(query)), or embed now."""
+    if embedding_task is not None:
+        return await embedding_task
+    return await _embed(query)
+
 
+def _context_key(*parts: str) -> str:
+    """Stable hash of the non-query inputs a cached completion depends on."""
+    return hashlib.md5("\x1f".join(parts).encode()).hexdigest()
 
-DECOMPOSITION_PROMPT = """You are a search query optimizer for a world-class research assistant.
+
+def _semantic_scope(query: str) -> Tuple[Optional[str], int]:
+    """
+    Exact-match part of a query's semantic cache key, and the entry TTL.
+    Embeddings collapse dates and numbers ("iPhone 15" vs "iPhone 16"), so the
+    resolved time window and parameter tokens must match too. The scope is None
+    when the query is too time-sensitive to cache at all.
+    """
+    _, window, params, ttl = cache_key(query)
+    if ttl < MIN_CACHE_TTL:
+        return None, ttl
+    return _context_key(window or "", *params), ttl
+
+
+# Exact-match decomposition cache on disk (survives restarts). Bump
+# DECOMPOSITION_VERSION whenever DECOMPOSITION_SYSTEM changes.
+DECOMPOSITION_MODEL = "gpt-4o-mini"
+DECOMPOSITION_VERSION = "v2"
+_decomp_disk_cache = Cache(
+    os.path.join(os.getenv("VETTAN_CACHE_DIR", "/tmp/vettan"), "decomp"),
+    size_limit=512 << 20
+)
+atexit.register(_decomp_disk_cache.close)
+
+# Sent as a byte-identical system message; the raw query is the user message
+DECOMPOSITION_SYSTEM = """You are a search query optimizer for a world-class research assistant.
 
 Given a research question, generate exactly 3-4 focused search queries that together will provide comprehensive, multi-angle coverage of the topic.
 
@@ -25,51 +119,101 @@ Rules:
 - Keep queries concise: 3-8 words each
 - Include the current year (2025) in at least one query for recency
 - Prioritize queries that will surface authoritative sources (academic, government, major news)
-- Output ONLY a valid JSON array of strings, nothing else
+- Output ONLY a JSON object of the form {"queries": ["...", "..."]}
 
 Examples:
-Input: "Cancer vaccine developments"
-Output: ["mRNA cancer vaccine clinical trials 2025", "personalized cancer vaccine research progress", "cancer immunotherapy combination therapy results", "ARPA-H cancer vaccine funding"]
+Input: Cancer vaccine developments
+Output: {"queries": ["mRNA cancer vaccine clinical trials 2025", "personalized cancer vaccine research progress", "cancer immunotherapy combination therapy results", "ARPA-H cancer vaccine funding"]}
 
-Input: "Best AI browsers in 2025"
-Output: ["AI powered web browsers 2025 review", "Arc browser AI features", "Chrome Gemini AI integration", "AI browser comparison benchmark"]
+Input: Best AI browsers in 2025
+Output: {"queries": ["AI powered web browsers 2025 review", "Arc browser AI features", "Chrome Gemini AI integration", "AI browser comparison benchmark"]}
 
-Input: "How do RAG systems work?"
-Output: ["RAG retrieval augmented generation architecture explained", "RAG system components vector database", "RAG vs fine tuning LLM comparison 2025"]
+Input: How do RAG systems work?
+Output: {"queries": ["RAG retrieval augmented generation architecture explained", "RAG system components vector database", "RAG vs fine tuning LLM comparison 2025"]}"""
 
-Input: {query}
-Output:"""
 
+_QUERY_TOKEN_RE = re.compile(r"[a-z0-9]+")
+MAX_SUB_QUERIES = 3
+SUB_QUERY_SIMILARITY = 0.75  # Token Jaccard above this = same search
 
-async def decompose_query(query: str) -> List[str]:
+
+def _query_tokens(query: str) -> frozenset:
+    """Lowercased, punctuation-free tokens with a naive plural strip."""
+    return frozenset(
+        t[:-1] if len(t) > 3 and t.endswith("s") else t
+        for t in _QUERY_TOKEN_RE.findall(query.lower())
+    )
+
+
+def _normalize_query(query: str) -> str:
+    """Order-insensitive normalized form (search memo key)."""
+    return " ".join(sorted(_query_tokens(query)))
+
+
+def _dedupe_queries(queries: List[str]) -> List[str]:
+    """Drop near-duplicate sub-queries (they return overlapping URLs) and cap the fan-out."""
+    kept: List[str] = []
+    kept_tokens: List[frozenset] = []
+    for q in queries:
+        tokens = _query_tokens(q)
+        if not tokens:
+            continue
+        if any(len(tokens & other) / len(tokens | other) > SUB_QUERY_SIMILARITY for other in kept_tokens):
+            continue
+        kept.append(q)
+        kept_tokens.append(tokens)
+        if len(kept) == MAX_SUB_QUERIES:
+            break
+    return kept
+
+
+async def decompose_query(
+    query: str,
+    embedding_task: Optional["asyncio.Task[Optional[List[float]]]"] = None
+) -> List[str]:
     """
     Decompose a user query into 3-4 targeted search sub-queries.
     Falls back to original query if anything fails.
+    The embedding is only awaited on a disk-cache miss.
     """
+    disk_key = hashlib.sha256(
+        f"{DECOMPOSITION_VERSION}|{DECOMPOSITION_MODEL}|{' '.join(query.lower().split())}".encode()
+    ).hexdigest()
+    cached = _decomp_disk_cache.get(disk_key)
+    if cached:
+        return cached
+
+    scope, ttl = _semantic_scope(query)
+    query_embedding = await _query_embedding(query, embedding_task) if scope is not None else None
+    if query_embedding:
+        cached = decomposition_cache.get(query_embedding, context_key=scope)
+        if cached:
+            return cached
+
     try:
-        response = await openai_client.chat.completions.create(
-            model="gpt-4o-mini",
+        response = await _chat(
+            model=DECOMPOSITION_MODEL,
             messages=[
-                {"role": "user", "content": DECOMPOSITION_PROMPT.format(query=json.dumps(query))}
+                {"role": "system", "content": DECOMPOSITION_SYSTEM},
+                {"role": "user", "content": query}
             ],
+            response_format={"type": "json_object"},
             temperature=0.2,
             max_tokens=200
         )
 
-        content = response.choices[0].message.content.strip()
-
-        # Handle ```json ... ``` wrapping
-        if "```" in content:
-            content = content.split("```")[1].replace("json", "").strip()
+        content = response.choices[0].message.content
+        queries = orjson.loads(content).get("queries")
 
-        parsed = json.loads(content)
+        sub_queries = None
+        if isinstance(queries, list) and queries and all(isinstance(q, str) for q in queries):
+            sub_queries = _dedupe_queries(queries)
 
-        if isinstance(parsed, list) and len(parsed) >= 2:
-            return parsed[:4]
-        elif isinstance(parsed, dict):
-            for key in parsed:
-                if isinstance(parsed[key], list):
-                    return parsed[key][:4]
+        if sub_queries:
+            _decomp_disk_cache.set(disk_key, sub_queries, expire=min(7 * 86400, ttl))
+            if query_embedding:
+                decomposition_cache.put(query_embedding, sub_queries, context_key=scope, ttl=ttl)
+            return sub_queries
 
         logger.warning(f"Unexpected decomposition format: {content}")
         return [query]
@@ -83,21 +227,51 @@ async def decompose_query(query: str) -> List[str]:
 # Step 2: Parallel Tavily Search
 # ──────────────────────────────────────────────
 
-def _single_search(query: str, max_results: int = 5) -> Dict[str, Any]:
-    """Single Tavily search — runs in thread pool."""
+# Native async Tavily REST calls over one keep-alive pool (no thread hops,
+# TLS amortized across searches), plus a cap on in-flight searches
+_tavily_http = httpx.AsyncClient(
+    base_url="https://api.tavily.com",
+    http2=True,
+    timeout=5.0,
+    limits=httpx.Limits(max_keepalive_connections=32, max_connections=64)
+)
+_tavily_sem = asyncio.Semaphore(8)
+
+# Back-to-back research on the same topic reuses recent search results
+_search_memo: TTLCache = TTLCache(maxsize=512, ttl=30 * 60)
+
+@with_retry
+async def _tavily_search(query: str, max_results: int) -> Dict[str, Any]:
+    """POST /search (retried on 429/5xx/transport errors)."""
+    async with _tavily_sem:
+        response = await _tavily_http.post("/search", json={
+            "api_key": TAVILY_API_KEY,
+            "query": query,
+            "max_results": max_results,
+            "search_depth": "basic",
+            "include_answer": True
+        })
+    response.raise_for_status()
+    return orjson.loads(response.content)  # Raw bytes, no decode step
+
+
+async def _single_search(query: str, max_results: int = 5) -> Dict[str, Any]:
+    """Single Tavily search."""
+    memo_key = (_normalize_query(query), max_results)
+    memoized = _search_memo.get(memo_key)
+    if memoized:
+        return {**memoized, "query": query}
+
     try:
-        result = tavily_client.search(
-            query=query,
-            max_results=max_results,
-            search_depth="basic",
-            include_answer=True
-        )
-        return {
+        result = await _tavily_search(query, max_results)
+        search_result = {
             "query": query,
             "answer": result.get("answer", ""),
             "results": result.get("results", []),
             "success": True
         }
+        _search_memo[memo_key] = search_result
+        return search_result
     except Exception as e:
         logger.error(f"Search failed for '{query}': {e}")
         return {"query": query, "answer": "", "results": [], "success": False}
@@ -108,23 +282,26 @@ async def parallel_search(queries: List[str], max_results_per_query: int = 5) ->
     Execute multiple Tavily searches concurrently.
     Deduplicates by URL, sorts by relevance score, returns top 8 sources.
     """
-    loop = asyncio.get_event_loop()
-
     tasks = [
-        loop.run_in_executor(None, _single_search, q, max_results_per_query)
+        asyncio.create_task(_single_search(q, max_results_per_query))
         for q in queries
     ]
 
     try:
         results = await asyncio.wait_for(
             asyncio.gather(*tasks, return_exceptions=True),
-            timeout=10.0
+            timeout=20.0  # Room for retries
         )
     except asyncio.TimeoutError:
         logger.warning("Parallel search timed out")
         results = []
 
-    all_sources = []
+    return _merge_search_results(results, total_searches=len(queries))
+
+
+def _merge_search_results(results: List[Any], total_searches: int) -> Dict[str, Any]:
+    """Deduplicate search results by URL and keep the top 5 by relevance score."""
+    scored_sources = []  # (score, -arrival, source): ties keep arrival order
     seen_urls = set()
     tavily_answers = []
     successful = 0
@@ -141,27 +318,29 @@ async def parallel_search(queries: List[str], max_results_per_query: int = 5) ->
             url = source.get("url", "")
             if url and url not in seen_urls:
                 seen_urls.add(url)
-                all_sources.append({
+                score = source.get("score", 0)
+                scored_sources.append((score or 0, -len(scored_sources), {
                     "title": source.get("title", ""),
                     "url": url,
+                    "domain": urlsplit(url).netloc or url,
                     "content": source.get("content", ""),
-                    "score": source.get("score", 0),
+                    "score": score,
                     "query": result.get("query", "")
-                })
-
-    all_sources.sort(key=lambda x: x.get("score", 0), reverse=True)
+                }))
 
     return {
-        "sources": all_sources[:5],
+        "sources": [source for _, _, source in heapq.nlargest(5, scored_sources)],
         "tavily_answers": tavily_answers,
         "successful_searches": successful,
-        "total_searches": len(queries)
+        "total_searches": total_searches
     }
 
 
-SYNTHESIS_PROMPT = """You are Vettan, a world-class AI research assistant. Your research quality rivals ChatGPT, Claude, and Gemini. You provide comprehensive, deeply researched, well-cited answers.
+# Static instructions go in a byte-identical system message so OpenAI's
+# automatic prompt caching can reuse the prefix; per-request content follows.
+SYNTHESIS_SYSTEM_PROMPT = """You are Vettan, a world-class AI research assistant. Your research quality rivals ChatGPT, Claude, and Gemini. You provide comprehensive, deeply researched, well-cited answers.
 
-Based on the search results below, write a thorough and authoritative response to the user's question.
+Based on the search results provided, write a thorough and authoritative response to the user's question.
 
 Guidelines for world-class quality:
 - Start with a concise overview paragraph summarizing the key findings
@@ -173,86 +352,239 @@ Guidelines for world-class quality:
 - End with a brief "Key Takeaways" section if the response covers multiple aspects
 - Write with authority and precision — no hedging language like "it seems" or "perhaps"
 - Be comprehensive but concise — aim for 300-500 words maximum
-- Prioritize depth on the most important findings over breadth across all topics
-
-{tavily_summary}
+- Prioritize depth on the most important findings over breadth across all topics"""
 
-Search Results:
+SYNTHESIS_USER_PROMPT = """Search Results:
 {search_context}
 
+{tavily_summary}
+
 User Question: {query}
 
 Comprehensive Research Response:"""
 
+# Template split once at import; per-call assembly is plain concatenation
+_SYNTH_PREFIX, _rest = SYNTHESIS_USER_PROMPT.split("{search_context}")
+_SYNTH_MIDDLE, _rest = _rest.split("{tavily_summary}")
+_SYNTH_QUESTION, _SYNTH_SUFFIX = _rest.split("{query}")
+
+FOLLOWUP_SYSTEM_PROMPT = (
+    "You are Vettan AI, a world-class research assistant. "
+    "Answer the follow-up question based on the conversation context. "
+    "Maintain the same comprehensive, well-cited quality. "
+    "If the question requires new information not in the conversation, say so clearly."
+)
+
+# Follow-up context = opening exchange (query + report, identical every turn so
+# it stays in OpenAI's cached prefix) + recent turns packed newest-first into a
+# token budget (the oldest turn that doesn't fit is cut to the remainder)
+FOLLOWUP_MODEL = "gpt-4o-mini"
+FOLLOWUP_ANCHOR_MESSAGES = 2
+FOLLOWUP_RECENT_TOKENS = 3000
+
+# Stored messages never change, so their token ids are cached by message id
+_message_tokens: LRUCache = LRUCache(maxsize=4096)
+
+# Concurrent identical follow-ups (same turn, same question) share one LLM call
+_followup_inflight: Dict[str, "asyncio.Task[Any]"] = {}
+
+
+def _log_cached_tokens(stage: str, response: Any) -> int:
+    """Log (and return) how many prompt tokens OpenAI served from its prefix cache."""
+    usage = getattr(response, "usage", None)
+    details = getattr(usage, "prompt_tokens_details", None)
+    if details is None:
+        return 0
+    logger.debug(f"[Pipeline] {stage} prompt cache: {details.cached_tokens}/{usage.prompt_tokens} tokens")
+    return details.cached_tokens or 0
+
+
+MAX_SOURCE_WORDS = 400
+_FIRST_WORDS_RE = re.compile(rf"\s*(?:\S+\s+){{{MAX_SOURCE_WORDS - 1}}}\S+")
+_NON_SPACE_RE = re.compile(r"\S")
+
+
+def _truncate_words(text: str) -> str:
+    """Cut text after MAX_SOURCE_WORDS words in one scan (no full tokenization)."""
+    match = _FIRST_WORDS_RE.match(text)
+    if match and _NON_SPACE_RE.search(text, match.end()):
+        return text[:match.end()] + "..."
+    return text
+
 
 def _format_search_context(sources: List[Dict[str, Any]]) -> str:
     """Format search results into LLM context."""
-    parts = []
+    buf = io.StringIO()
     for i, source in enumerate(sources, 1):
-        content = source.get("content", "")
-        words = content.split()
-        if len(words) > 400:
-            content = " ".join(words[:400]) + "..."
-
-        parts.append(
-            f"[Source {i}] {source.get('title', 'Untitled')}\n"
-            f"URL: {source.get('url', '')}\n"
-            f"Content: {content}"
-        )
-    return "\n\n---\n\n".join(parts)
-
-
-async def synthesize(
+        if i > 1:
+            buf.write("\n\n---\n\n")
+        # Written piecewise - no per-source intermediate strings
+        buf.write("[Source ")
+        buf.write(str(i))
+        buf.write("] ")
+        buf.write(source.get("title") or "Untitled")
+        buf.write("\nURL: ")
+        buf.write(source.get("url", ""))
+        buf.write("\nContent: ")
+        buf.write(_truncate_words(source.get("content") or ""))
+    return buf.getvalue()
+
+
+async def synthesize_stream(
     query: str,
     sources: List[Dict[str, Any]],
-    tavily_answers: List[str] = None
-) -> str:
-    """Generate a comprehensive synthesis from search results."""
-    search_context = _format_search_context(sources)
+    tavily_answers: List[str] = None,
+    embedding_task: Optional["asyncio.Task[Optional[List[float]]]"] = None
+) -> AsyncIterator[str]:
+    """
+    Stream the synthesis as sentence-complete chunks while the model decodes,
+    so downstream consumers (TTS) can start before generation finishes.
+    """
+    # Only reuse a synthesis built from exactly the same sources
+    scope, ttl = _semantic_scope(query)
+    sources_key = _context_key(scope or "", *sorted(s.get("url", "") for s in sources))
+    query_embedding = await _query_embedding(query, embedding_task) if scope is not None else None
+    if query_embedding:
+        cached = synthesis_cache.get(query_embedding, context_key=sources_key)
+        if cached:
+            yield cached
+            return
+
+    # Stable order (not score) so retries over the same sources match byte-for-byte
+    ordered_sources = sorted(sources, key=lambda src: _context_key(src.get("url", "")))
+    search_context = _format_search_context(ordered_sources)
 
     tavily_summary = ""
     if tavily_answers:
         combined = " ".join(tavily_answers).strip()
         if combined:
-            tavily_summary = f"Quick context from search engine: {combined}\n\n(Base your response primarily on the detailed source content below.)"
-
-    prompt = SYNTHESIS_PROMPT.format(
-        search_context=search_context,
-        tavily_summary=tavily_summary,
-        query=query
+            tavily_summary = f"Quick context from search engine: {combined}\n\n(Base your response primarily on the detailed source content above.)"
+
+    user_prompt = "".join((
+        _SYNTH_PREFIX, search_context,
+        _SYNTH_MIDDLE, tavily_summary,
+        _SYNTH_QUESTION, query, _SYNTH_SUFFIX
+    ))
+
+    stream = await _chat(
+        model="gpt-4o-mini",
+        messages=[
+            {"role": "system", "content": SYNTHESIS_SYSTEM_PROMPT},
+            {"role": "user", "content": user_prompt}
+        ],
+        temperature=0.3,
+        max_tokens=1500,
+        stream=True,
+        stream_options={"include_usage": True}
     )
 
+    parts: List[str] = []
+    buffer = ""
+    async for chunk in stream:
+        if chunk.usage:
+            _log_cached_tokens("Synthesis", chunk)
+        if not chunk.choices or not chunk.choices[0].delta.content:
+            continue
+
+        delta = chunk.choices[0].delta.content
+        parts.append(delta)
+        buffer += delta
+
+        # Emit through the last complete sentence (or a long run without one)
+        last_end = None
+        for last_end in _SENTENCE_END_RE.finditer(buffer):
+            pass
+        if last_end:
+            yield buffer[:last_end.end()]
+            buffer = buffer[last_end.end():]
+        elif len(buffer) >= STREAM_FLUSH_CHARS:
+            yield buffer
+            buffer = ""
+
+    if buffer:
+        yield buffer
+
+    content = "".join(parts)
+    if query_embedding and content:
+        synthesis_cache.put(query_embedding, content, context_key=sources_key, ttl=ttl)
+
+
+async def synthesize(
+    query: str,
+    sources: List[Dict[str, Any]],
+    tavily_answers: List[str] = None,
+    embedding_task: Optional["asyncio.Task[Optional[List[float]]]"] = None
+) -> str:
+    """Generate a comprehensive synthesis from search results."""
     try:
-        response = await openai_client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.3,
-            max_tokens=1500
-        )
-        return response.choices[0].message.content
+        return "".join([
+            chunk async for chunk in synthesize_stream(query, sources, tavily_answers, embedding_task)
+        ])
 
     except Exception as e:
         logger.error(f"Synthesis failed: {e}")
         return f"Research synthesis encountered an error: {str(e)}"
 
 
+def _format_citations(sources: List[Dict[str, Any]], query: str) -> List[Dict[str, Any]]:
+    """Format sources as citations (same shape as the agent's citations)."""
+    return [
+        {
+            "url": s["url"],
+            "tool": "search_web",
+            "query": s.get("query", query),
+            "domain": s["domain"]
+        }
+        for s in sources
+    ]
+
+
+async def close_clients() -> None:
+    """Close pooled HTTP clients (called on app shutdown)."""
+    await _tavily_http.aclose()
+    await openai_client.close()
+
+
+async def _search_sub_queries(
+    sub_queries: List[str],
+    query: str,
+    spec_task: "asyncio.Task[Dict[str, Any]]"
+) -> Dict[str, Any]:
+    """
+    Search the sub-queries. When decomposition fell back to the raw query the
+    speculative search already covers it; otherwise it is cancelled.
+    """
+    if sub_queries == [query]:
+        return _merge_search_results([await spec_task], total_searches=1)
+
+    spec_task.cancel()
+    return await parallel_search(queries=sub_queries, max_results_per_query=5)
+
+
 async def research_complete(query: str) -> Dict[str, Any]:
     """
     Full research pipeline. Returns result in the EXACT same format
     as the old original_research() function so cached_research_agent.py
     and main.py can use it without changes to downstream logic.
     """
-    start_time = time.time()
+    start_time = time.perf_counter()
+
+    # Speculative search on the raw query, overlapping decomposition
+    spec_task = asyncio.create_task(_single_search(query, 5))
+
+    # Embedded once, off the critical path - shared by the decomposition and
+    # synthesis caches and only awaited where one of them is consulted
+    embedding_task = asyncio.create_task(_embed(query))
 
     # Step 1: Decompose query (~1s)
-    sub_queries = await decompose_query(query)
-    decomp_time = time.time() - start_time
+    sub_queries = await decompose_query(query, embedding_task=embedding_task)
+    decomp_time = time.perf_counter() - start_time
     logger.info(f"[Pipeline] Decomposed in {decomp_time:.1f}s: {sub_queries}")
 
     # Step 2: Parallel search (~1-2s)
-    search_start = time.time()
-    search_results = await parallel_search(queries=sub_queries, max_results_per_query=5)
-    search_time = time.time() - search_start
+    search_start = time.perf_counter()
+    search_results = await _search_sub_queries(sub_queries, query, spec_task)
+    search_time = time.perf_counter() - search_start
     logger.info(
         f"[Pipeline] Search done in {search_time:.1f}s: "
         f"{search_results['successful_searches']}/{search_results['total_searches']} ok, "
@@ -260,7 +592,7 @@ async def research_complete(query: str) -> Dict[str, Any]:
     )
 
     # Step 3: Synthesize (~3-8s)
-    synthesis_start = time.time()
+    synthesis_start = time.perf_counter()
 
     if not search_results["sources"]:
         response_text = "I couldn't find relevant search results for your query. Please try rephrasing your question."
@@ -268,11 +600,12 @@ async def research_complete(query: str) -> Dict[str, Any]:
         response_text = await synthesize(
             query=query,
             sources=search_results["sources"],
-            tavily_answers=search_results.get("tavily_answers", [])
+            tavily_answers=search_results.get("tavily_answers", []),
+            embedding_task=embedding_task
         )
 
-    synthesis_time = time.time() - synthesis_start
-    total_time = time.time() - start_time
+    synthesis_time = time.perf_counter() - synthesis_start
+    total_time = time.perf_counter() - start_time
 
     logger.info(
         f"[Pipeline] Complete: decomp={decomp_time:.1f}s, "
@@ -281,15 +614,7 @@ async def research_complete(query: str) -> Dict[str, Any]:
     )
 
     # Format citations to match existing format EXACTLY
-    citations = [
-        {
-            "url": s["url"],
-            "tool": "search_web",
-            "query": s.get("query", query),
-            "domain": s["url"].split("/")[2] if len(s["url"].split("/")) > 2 else s["url"]
-        }
-        for s in search_results["sources"]
-    ]
+    citations = _format_citations(search_results["sources"], query)
 
     return {
         "output": response_text,
@@ -308,6 +633,71 @@ async def research_complete(query: str) -> Dict[str, Any]:
     }
 
 
+def _followup_turn_key(conversation_history: List[Dict[str, str]]) -> str:
+    """A follow-up answer depends on the turn it follows, not just the question."""
+    last_assistant = next(
+        (m.get("content", "") for m in reversed(conversation_history) if m.get("role") == "assistant"),
+        ""
+    )
+    return _context_key(last_assistant)
+
+
+@functools.lru_cache(maxsize=None)
+def _encoding() -> "tiktoken.Encoding":
+    """Tokenizer for the follow-up model (loaded on first use)."""
+    return tiktoken.encoding_for_model(FOLLOWUP_MODEL)
+
+
+def _message_token_ids(msg: Dict[str, str]) -> List[int]:
+    """Token ids of a message's content (cached for stored messages)."""
+    msg_id = msg.get("id")
+    tokens = _message_tokens.get(msg_id) if msg_id else None
+    if tokens is None:
+        tokens = _encoding().encode_ordinary(msg.get("content", ""))  # User text, never special tokens
+        if msg_id:
+            _message_tokens[msg_id] = tokens
+    return tokens
+
+
+def _pack_recent(messages: List[Dict[str, str]], budget: int) -> List[Dict[str, str]]:
+    """Most recent messages that fit in `budget` tokens, oldest first; the one that overflows is truncated."""
+    packed = []
+    used = 0
+    for msg in reversed(messages):
+        tokens = _message_token_ids(msg)
+        if used + len(tokens) > budget:
+            if budget > used:
+                packed.append({"role": msg.get("role", "user"), "content": _encoding().decode(tokens[:budget - used])})
+            break
+        packed.append(msg)
+        used += len(tokens)
+    packed.reverse()
+    return packed
+
+
+def _followup_messages(query: str, conversation_history: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    """Chat messages for a follow-up: stable prefix first (system + opening exchange), variable turns strictly last."""
+    anchor = conversation_history[:FOLLOWUP_ANCHOR_MESSAGES]
+    recent = _pack_recent(conversation_history[FOLLOWUP_ANCHOR_MESSAGES:], FOLLOWUP_RECENT_TOKENS)
+
+    messages = [{"role": "system", "content": FOLLOWUP_SYSTEM_PROMPT}]
+
+    for msg in anchor + recent:
+        messages.append({
+            "role": msg.get("role", "user"),
+            "content": msg.get("content", "")
+        })
+
+    messages.append({"role": "user", "content": query})
+    return messages
+
+
+def _drop_inflight(flight_key: str, call: "asyncio.Task[Any]") -> None:
+    """Unregister a shared follow-up call, unless a newer one already took its key."""
+    if _followup_inflight.get(flight_key) is call:
+        del _followup_inflight[flight_key]
+
+
 async def handle_followup(
     query: str,
     conversation_history: List[Dict[str, str]]
@@ -317,45 +707,79 @@ async def handle_followup(
     Returns result in the same format as research_complete().
     ~2-3s instead of running the full pipeline.
     """
-    start_time = time.time()
-
-    messages = [
-        {
-            "role": "system",
-            "content": (
-                "You are Vettan AI, a world-class research assistant. "
-                "Answer the follow-up question based on the conversation context. "
-                "Maintain the same comprehensive, well-cited quality. "
-                "If the question requires new information not in the conversation, say so clearly."
-            )
-        }
-    ]
-
-    for msg in conversation_history[-6:]:
-        messages.append({
-            "role": msg.get("role", "user"),
-            "content": msg.get("content", "")
-        })
-
-    messages.append({"role": "user", "content": query})
-
-    try:
-        response = await openai_client.chat.completions.create(
-            model="gpt-4o-mini",
+    start_time = time.perf_counter()
+
+    turn_key = _followup_turn_key(conversation_history)
+    scope, ttl = _semantic_scope(query)
+    followup_key = _context_key(turn_key, scope or "")
+    messages = _followup_messages(query, conversation_history)
+
+    # The LLM call starts alongside the embedding for the semantic cache lookup
+    # and is dropped on a hit, so a miss pays no embedding latency
+    embedding_task = asyncio.create_task(_embed(query)) if scope is not None else None
+    flight_key = _context_key(turn_key, " ".join(query.lower().split()))
+    call = _followup_inflight.get(flight_key)
+    owns_call = call is None
+    if owns_call:
+        call = asyncio.create_task(_chat(
+            model=FOLLOWUP_MODEL,
             messages=messages,
             temperature=0.3,
             max_tokens=1500
-        )
+        ))
+        _followup_inflight[flight_key] = call
+        call.add_done_callback(lambda done: _drop_inflight(flight_key, done))
+    else:
+        logger.info("[Pipeline] Follow-up joined an in-flight identical request")
+
+    query_embedding = await embedding_task if embedding_task else None
+    if query_embedding:
+        cached = followup_cache.get(query_embedding, context_key=followup_key)
+        if cached:
+            if owns_call:
+                _drop_inflight(flight_key, call)
+                call.cancel()
+            return {
+                "output": cached,
+                "citations": [],
+                "metadata": {
+                    "total_time": round(time.perf_counter() - start_time, 1),
+                    "followup": True,
+                    "pipeline": "direct_llm",
+                    "semantic_cache_hit": True
+                }
+            }
 
-        total_time = time.time() - start_time
+    try:
+        # Shielded so one disconnecting client doesn't cancel the shared call
+        try:
+            response = await asyncio.shield(call)
+        except asyncio.CancelledError:
+            if not call.cancelled():
+                raise  # This request itself was cancelled
+            # The call's owner got a cache hit and dropped it
+            response = await _chat(
+                model=FOLLOWUP_MODEL,
+                messages=messages,
+                temperature=0.3,
+                max_tokens=1500
+            )
+        cached_tokens = _log_cached_tokens("Follow-up", response)
+
+        total_time = time.perf_counter() - start_time
+        content = response.choices[0].message.content
+        if query_embedding and content:
+            followup_cache.put(query_embedding, content, context_key=followup_key, ttl=ttl)
 
         return {
-            "output": response.choices[0].message.content,
+            "output": content,
             "citations": [],
             "metadata": {
                 "total_time": round(total_time, 1),
                 "followup": True,
-                "pipeline": "direct_llm"
+                "pipeline": "direct_llm",
+                "cache_hit": cached_tokens > 0,
+                "cached_tokens": cached_tokens
             }
         }
 
@@ -365,4 +789,181 @@ async def handle_followup(
             "output": f"Error handling follow-up: {str(e)}",
             "citations": [],
             "metadata": {"followup": True, "error": True}
-        }
\ No newline at end of file
+        }
+
+
+async def _drop_stream(stream_task: "asyncio.Task[Any]") -> None:
+    """Cancel a chat stream that is no longer needed (closing it if already open)."""
+    if not stream_task.done():
+        stream_task.cancel()
+        return
+    if not stream_task.cancelled() and stream_task.exception() is None:
+        await stream_task.result().close()
+
+
+async def stream_followup(
+    query: str,
+    conversation_history: List[Dict[str, str]]
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Streaming variant of handle_followup().
+    Yields "text" deltas as the model decodes, then a final "done" carrying
+    the full output and metadata (for persistence).
+    """
+    start_time = time.perf_counter()
+
+    scope, ttl = _semantic_scope(query)
+    followup_key = _context_key(_followup_turn_key(conversation_history), scope or "")
+
+    # Open the stream alongside the embedding for the semantic cache lookup;
+    # it is dropped on a hit, so a miss pays no embedding latency
+    embedding_task = asyncio.create_task(_embed(query)) if scope is not None else None
+    stream_task = asyncio.create_task(_chat(
+        model=FOLLOWUP_MODEL,
+        messages=_followup_messages(query, conversation_history),
+        temperature=0.3,
+        max_tokens=1500,
+        stream=True,
+        stream_options={"include_usage": True}
+    ))
+
+    query_embedding = await embedding_task if embedding_task else None
+    if query_embedding:
+        cached = followup_cache.get(query_embedding, context_key=followup_key)
+        if cached:
+            await _drop_stream(stream_task)
+            yield {"type": "text", "delta": cached}
+            yield {
+                "type": "done",
+                "output": cached,
+                "metadata": {
+                    "total_time": round(time.perf_counter() - start_time, 1),
+                    "followup": True,
+                    "pipeline": "direct_llm_stream",
+                    "semantic_cache_hit": True
+                }
+            }
+            return
+
+    parts: List[str] = []
+    cached_tokens = 0
+    first_token_time = None
+    try:
+        stream = await stream_task
+        async for chunk in stream:
+            if chunk.usage:
+                cached_tokens = _log_cached_tokens("Follow-up", chunk)
+            if not chunk.choices or not chunk.choices[0].delta.content:
+                continue
+
+            if first_token_time is None:
+                first_token_time = time.perf_counter() - start_time
+            delta = chunk.choices[0].delta.content
+            parts.append(delta)
+            yield {"type": "text", "delta": delta}
+
+    except Exception as e:
+        logger.error(f"Follow-up stream failed: {e}")
+        yield {"type": "error", "message": f"Error handling follow-up: {str(e)}"}
+        return
+
+    content = "".join(parts)
+    if query_embedding and content:
+        followup_cache.put(query_embedding, content, context_key=followup_key, ttl=ttl)
+
+    yield {
+        "type": "done",
+        "output": content,
+        "metadata": {
+            "total_time": round(time.perf_counter() - start_time, 1),
+            "time_to_first_token": round(first_token_time or 0, 2),
+            "followup": True,
+            "pipeline": "direct_llm_stream",
+            "cache_hit": cached_tokens > 0,
+            "cached_tokens": cached_tokens
+        }
+    }
+
+
+async def stream_research_with_audio(query: str, voice: str = "nova") -> AsyncIterator[Dict[str, Any]]:
+    """
+    Research pipeline that overlaps synthesis decoding with TTS.
+    Yields events in order: "text" deltas, "audio" mp3 segments (base64,
+    in playback order) as they become ready, then a final "done".
+    """
+    start_time = time.perf_counter()
+    tts = get_tts()
+
+    spec_task = asyncio.create_task(_single_search(query, 5))
+    embedding_task = asyncio.create_task(_embed(query))
+    sub_queries = await decompose_query(query, embedding_task=embedding_task)
+    search_results = await _search_sub_queries(sub_queries, query, spec_task)
+    citations = _format_citations(search_results["sources"], query)
+
+    if not search_results["sources"]:
+        yield {"type": "text", "delta": "I couldn't find relevant search results for your query. Please try rephrasing your question."}
+        yield {"type": "done", "citations": [], "metadata": {"sub_queries": sub_queries, "pipeline": "streaming_audio"}}
+        return
+
+    async def _speak(text: str, intro: bool) -> Optional[bytes]:
+        speech_text = tts.prepare_text_for_speech(text, intro=intro)
+        async with _tts_sem:
+            return await asyncio.to_thread(tts.generate_audio, speech_text, voice)
+
+    audio_tasks: List[asyncio.Task] = []
+    next_audio = 0
+    pending_text = ""
+
+    def _ready_audio() -> List[Dict[str, Any]]:
+        # Emit finished segments strictly in order
+        nonlocal next_audio
+        events = []
+        while next_audio < len(audio_tasks) and audio_tasks[next_audio].done():
+            task = audio_tasks[next_audio]
+            audio = None if task.cancelled() or task.exception() else task.result()
+            if audio:
+                events.append({"type": "audio", "index": next_audio, "audio": base64.b64encode(audio).decode("utf-8")})
+            next_audio += 1
+        return events
+
+    # A client disconnect closes this generator - stop paying for unplayed TTS
+    try:
+        try:
+            async for sentence in synthesize_stream(query, search_results["sources"], search_results.get("tavily_answers", []), embedding_task):
+                yield {"type": "text", "delta": sentence}
+
+                pending_text += sentence
+                if len(pending_text) >= AUDIO_BATCH_CHARS:
+                    audio_tasks.append(asyncio.create_task(_speak(pending_text, intro=not audio_tasks)))
+                    pending_text = ""
+
+                for event in _ready_audio():
+                    yield event
+
+        except Exception as e:
+            logger.error(f"Streaming synthesis failed: {e}")
+            yield {"type": "text", "delta": f"Research synthesis encountered an error: {str(e)}"}
+
+        if pending_text.strip():
+            audio_tasks.append(asyncio.create_task(_speak(pending_text, intro=not audio_tasks)))
+
+        # Remaining segments, in order
+        for task in audio_tasks[next_audio:]:
+            await asyncio.wait([task])
+        for event in _ready_audio():
+            yield event
+
+        yield {
+            "type": "done",
+            "citations": citations,
+            "metadata": {
+                "total_time": round(time.perf_counter() - start_time, 1),
+                "sources_count": len(search_results["sources"]),
+                "sub_queries": sub_queries,
+                "audio_segments": len(audio_tasks),
+                "pipeline": "streaming_audio"
+            }
+        }
+    finally:
+        for task in audio_tasks:
+            task.cancel()
@@ -5,13 +5,37 @@ Handles reports up to 15,000 characters (~10 minutes audio)
 """
 
 from openai import OpenAI
+import httpx
 import os
-from typing import Optional, List
+import atexit
+import hashlib
+from diskcache import Cache
+from utils.retry import with_retry
+from typing import Optional, List, Tuple
+import io
 import re
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Shared keep-alive pool sized for parallel chunk requests (owned by the
+# get_tts() singleton's client)
+_http = httpx.Client(
+    limits=httpx.Limits(max_keepalive_connections=32, max_connections=64),
+    http2=True,
+    timeout=httpx.Timeout(60.0, connect=10.0)
+)
+
+# Content-addressed MP3 cache per TTS request (a chunked report caches
+# each chunk, so replays and shared reports skip the API entirely)
+_audio_cache = Cache(
+    os.path.join(os.getenv("VETTAN_CACHE_DIR", "/tmp/vettan"), "tts"),
+    size_limit=2 << 30,
+    eviction_policy="least-recently-used"
+)
+atexit.register(_audio_cache.close)
+
 
 class VettanTTS:
     """Text-to-Speech with support for long reports"""
@@ -27,10 +51,41 @@ class VettanTTS:
     
     DEFAULT_VOICE = "nova"
     
+    # Supported response formats -> MIME type (opus is ~half the bytes of mp3)
+    AUDIO_FORMATS = {
+        'mp3': 'audio/mpeg',
+        'opus': 'audio/ogg',
+        'aac': 'audio/aac'
+    }
+    DEFAULT_FORMAT = "mp3"
+    STREAM_READ_SIZE = 4096
+    
     # OpenAI TTS limits
     MAX_CHARS_PER_REQUEST = 4096  # OpenAI's hard limit
-    SAFE_CHUNK_SIZE = 3900  # Leave buffer for safety
+    SAFE_CHUNK_SIZE = 4050  # Chunk lengths are exact (separators included)
     RECOMMENDED_MAX = 15000  # ~10 min audio
+    MAX_PARALLEL_CHUNKS = 4  # Respect OpenAI TTS rate limits
+    
+    # Markdown stripped for speech in ONE pass (alternatives tried in order at each position)
+    _MARKDOWN_RE = re.compile(
+        r'(?P<code_block>```[^`]*```)'
+        r'|(?P<header>^#+\s+)'
+        r'|(?P<link>\[(?P<link_text>[^\]]+)\]\([^\)]+\))'
+        r'|(?P<bold>\*\*(?P<bold_text>[^\*]+)\*\*)'
+        r'|(?P<bullet>^\s*[-*•]\d*\.?\s+)'
+        r'|(?P<italic>\*(?P<italic_text>[^\*]+)\*)'
+        r'|(?P<source>\[Source:[^\]]+\])'
+        r'|(?P<code>`(?P<code_text>[^`]+)`)',
+        re.MULTILINE
+    )
+    _MARKDOWN_KEEP = {'link': 'link_text', 'bold': 'bold_text', 'italic': 'italic_text', 'code': 'code_text'}
+    
+    # Chunk boundaries for long reports
+    _PARAGRAPH_BREAK_RE = re.compile(r'\n\n+')
+    _SENTENCE_BREAK_RE = re.compile(r'(?<=[.!?])\s+')
+    
+    # Whitespace cleanup (paragraph breaks preserved)
+    _WHITESPACE_RE = re.compile(r'(?P<breaks>\n{3,})|[ \t]+')
     
     def __init__(self):
         """Initialize OpenAI client"""
@@ -38,14 +93,16 @@ class VettanTTS:
         if not api_key:
             raise ValueError("OPENAI_API_KEY required")
         
-        self.client = OpenAI(api_key=api_key)
+        # Retries are handled by with_retry (backoff + jitter)
+        self.client = OpenAI(api_key=api_key, http_client=_http, max_retries=0)
         print("✅ TTS initialized")
     
     def generate_audio(
         self,
         text: str,
         voice: str = DEFAULT_VOICE,
-        model: str = "tts-1"
+        model: str = "tts-1",
+        response_format: str = DEFAULT_FORMAT
     ) -> Optional[bytes]:
         """
         Generate audio for FULL-LENGTH text
@@ -55,6 +112,8 @@ class VettanTTS:
             text: Full text to convert (up to 15,000 chars)
             voice: Voice name
             model: TTS model
+            response_format: One of AUDIO_FORMATS (opus chunks concatenate
+                as chained Ogg streams without MP3 frame glitches)
             
         Returns:
             Complete audio bytes (full report)
@@ -71,66 +130,60 @@ class VettanTTS:
             
             # Single request if fits
             if len(text) <= self.SAFE_CHUNK_SIZE:
-                return self._generate_single(text, voice, model)
+                return self._generate_single(text, voice, model, response_format)
             
             # Multi-chunk for long text
             print(f"📦 Text exceeds single request limit - using chunked generation")
-            return self._generate_chunked(text, voice, model)
+            return self._generate_chunked(text, voice, model, response_format)
             
         except Exception as e:
             print(f"❌ TTS error: {e}")
             return None
     
-    def _generate_single(self, text: str, voice: str, model: str) -> Optional[bytes]:
+    def _generate_single(self, text: str, voice: str, model: str, response_format: str) -> Optional[bytes]:
         """Generate audio in single request"""
         print(f"🎵 Generating {len(text):,} chars with '{voice}'...")
         
-        response = self.client.audio.speech.create(
-            model=model,
-            voice=voice,
-            input=text,
-            response_format="mp3"
-        )
-        
-        audio_bytes = response.content
+        audio_bytes = self._tts_one(text, voice, model, response_format)
         print(f"✅ Generated {len(audio_bytes):,} bytes of audio")
         
         return audio_bytes if audio_bytes and len(audio_bytes) > 1000 else None
     
-    def _generate_chunked(self, text: str, voice: str, model: str) -> Optional[bytes]:
+    def _generate_chunked(self, text: str, voice: str, model: str, response_format: str) -> Optional[bytes]:
         """
         Generate audio for long text via chunking + concatenation
         """
         # Split into safe-sized chunks at paragraph boundaries
         chunks = self._smart_chunk(text, max_size=self.SAFE_CHUNK_SIZE)
+        if any(len(chunk) > self.MAX_CHARS_PER_REQUEST for chunk in chunks):
+            raise ValueError(f"TTS chunk exceeds {self.MAX_CHARS_PER_REQUEST} chars")
         
         print(f"📦 Split into {len(chunks)} chunks for generation")
         
-        # Generate audio for each chunk
+        # Generate chunks concurrently (I/O-bound), keeping playback order
         audio_parts: List[bytes] = []
         
-        for i, chunk in enumerate(chunks, 1):
-            print(f"🎵 Chunk {i}/{len(chunks)}: {len(chunk):,} chars...")
+        with ThreadPoolExecutor(max_workers=min(self.MAX_PARALLEL_CHUNKS, len(chunks))) as executor:
+            futures = [
+                executor.submit(self._tts_one, chunk, voice, model, response_format)
+                for chunk in chunks
+            ]
             
-            try:
-                response = self.client.audio.speech.create(
-                    model=model,
-                    voice=voice,
-                    input=chunk,
-                    response_format="mp3"
-                )
-                
-                chunk_audio = response.content
-                audio_parts.append(chunk_audio)
-                print(f"   ✅ Generated {len(chunk_audio):,} bytes")
+            for i, future in enumerate(futures, 1):
+                try:
+                    chunk_audio = future.result()
+                    audio_parts.append(chunk_audio)
+                    print(f"   ✅ Chunk {i}/{len(chunks)}: {len(chunk_audio):,} bytes")
                 
-            except Exception as e:
-                print(f"   ❌ Chunk {i} failed: {e}")
-                # If one chunk fails, return what we have so far
-                if audio_parts:
-                    print(f"   ⚠️ Returning partial audio ({i-1} chunks)")
-                    break
-                return None
+                except Exception as e:
+                    print(f"   ❌ Chunk {i} failed: {e}")
+                    for pending in futures[i:]:
+                        pending.cancel()
+                    # If one chunk fails, return what we have so far
+                    if audio_parts:
+                        print(f"   ⚠️ Returning partial audio ({i-1} chunks)")
+                        break
+                    return None
         
         # Concatenate all chunks
         if not audio_parts:
@@ -142,6 +195,34 @@ class VettanTTS:
         
         return combined_audio
     
+    def _tts_one(self, text: str, voice: str, model: str, response_format: str = DEFAULT_FORMAT) -> bytes:
+        """Single TTS request (cached, with retry/backoff on transient failures)"""
+        key = hashlib.sha256(
+            b"|".join([voice.encode(), model.encode(), response_format.encode(), text.encode()])
+        ).hexdigest()
+        cached = _audio_cache.get(key)
+        if cached:
+            return cached
+        
+        audio = self._speech_request(text, voice, model, response_format)
+        if audio and len(audio) > 1000:
+            _audio_cache.set(key, audio)
+        return audio
+    
+    @with_retry
+    def _speech_request(self, text: str, voice: str, model: str, response_format: str) -> bytes:
+        """Raw TTS API call, read as it streams (retried on rate limits, timeouts and 5xx)"""
+        buf = io.BytesIO()
+        with self.client.audio.speech.with_streaming_response.create(
+            model=model,
+            voice=voice,
+            input=text,
+            response_format=response_format
+        ) as response:
+            for data in response.iter_bytes(self.STREAM_READ_SIZE):
+                buf.write(data)
+        return buf.getvalue()
+    
     def _smart_chunk(self, text: str, max_size: int) -> List[str]:
         """
         Split text at natural boundaries (paragraphs, sentences)
@@ -150,69 +231,88 @@ class VettanTTS:
         1. Split by double newlines (paragraphs)
         2. If paragraph too long, split by sentences
         3. Keep chunks under max_size
+        
+        Works on (start, end) indices; each chunk is sliced out of text once.
         """
         chunks: List[str] = []
-        current_chunk = ""
+        chunk_start = chunk_end = -1  # Open chunk is text[chunk_start:chunk_end]
         
-        # Split by paragraphs
-        paragraphs = re.split(r'\n\n+', text)
-        
-        for para in paragraphs:
-            para = para.strip()
-            if not para:
-                continue
+        for start, end in self._spans(text, self._PARAGRAPH_BREAK_RE, 0, len(text)):
+            # Paragraphs too long on their own are packed sentence by sentence
+            if end - start <= max_size:
+                pieces = [(start, end)]
+            else:
+                pieces = self._spans(text, self._SENTENCE_BREAK_RE, start, end)
             
-            # If adding paragraph exceeds limit
-            if len(current_chunk) + len(para) + 2 > max_size:
-                # Save current chunk if it has content
-                if current_chunk:
-                    chunks.append(current_chunk.strip())
-                    current_chunk = ""
+            for piece_start, piece_end in pieces:
+                if chunk_start >= 0 and piece_end - chunk_start <= max_size:
+                    chunk_end = piece_end
+                    continue
                 
-                # If single paragraph is too long, split by sentences
-                if len(para) > max_size:
-                    sentences = re.split(r'(?<=[.!?])\s+', para)
-                    for sentence in sentences:
-                        if len(current_chunk) + len(sentence) + 1 > max_size:
-                            if current_chunk:
-                                chunks.append(current_chunk.strip())
-                            current_chunk = sentence
-                        else:
-                            current_chunk += " " + sentence if current_chunk else sentence
-                else:
-                    current_chunk = para
-            else:
-                current_chunk += "\n\n" + para if current_chunk else para
+                if chunk_start >= 0:
+                    chunks.append(text[chunk_start:chunk_end])
+                
+                # A single sentence over the limit is hard-split
+                while piece_end - piece_start > max_size:
+                    chunks.append(text[piece_start:piece_start + max_size])
+                    piece_start += max_size
+                chunk_start, chunk_end = piece_start, piece_end
         
         # Add final chunk
-        if current_chunk:
-            chunks.append(current_chunk.strip())
+        if chunk_start >= 0:
+            chunks.append(text[chunk_start:chunk_end])
         
         return chunks
     
-    def prepare_text_for_speech(self, markdown_text: str) -> str:
-        """Clean markdown for natural speech (NO LENGTH LIMIT)"""
+    @staticmethod
+    def _spans(text: str, separator: re.Pattern, start: int, end: int) -> List[Tuple[int, int]]:
+        """Whitespace-trimmed, non-empty (start, end) spans of text[start:end] between separators"""
+        bounds = []
+        pos = start
+        for match in separator.finditer(text, start, end):
+            bounds.append((pos, match.start()))
+            pos = match.end()
+        bounds.append((pos, end))
+        
+        spans = []
+        for span_start, span_end in bounds:
+            while span_start < span_end and text[span_start].isspace():
+                span_start += 1
+            while span_end > span_start and text[span_end - 1].isspace():
+                span_end -= 1
+            if span_start < span_end:
+                spans.append((span_start, span_end))
+        return spans
+    
+    def prepare_text_for_speech(self, markdown_text: str, intro: bool = True) -> str:
+        """
+        Clean markdown for natural speech (NO LENGTH LIMIT)
+        
+        Args:
+            markdown_text: Report (or streamed segment) to clean
+            intro: Prefix the spoken intro (first segment only when streaming)
+        """
         text = markdown_text
         
         # Remove markdown formatting
-        text = re.sub(r'^#+\s+', '', text, flags=re.MULTILINE)
-        text = re.sub(r'\[([^\]]+)\]\([^\)]+\)', r'\1', text)
-        text = re.sub(r'\*\*([^\*]+)\*\*', r'\1', text)
-        text = re.sub(r'\*([^\*]+)\*', r'\1', text)
-        text = re.sub(r'^\s*[-*•]\d*\.?\s+', '', text, flags=re.MULTILINE)
-        text = re.sub(r'\[Source:[^\]]+\]', '', text)
-        text = re.sub(r'```[^`]*```', '', text)
-        text = re.sub(r'`([^`]+)`', r'\1', text)
+        text = self._MARKDOWN_RE.sub(self._replace_markdown, text)
         
         # Clean whitespace but preserve paragraph breaks
-        text = re.sub(r'\n{3,}', '\n\n', text)
-        text = re.sub(r'[ \t]+', ' ', text)
+        text = self._WHITESPACE_RE.sub(lambda m: '\n\n' if m.group('breaks') else ' ', text)
         
         # Add intro
+        if not intro:
+            return text.strip()
         text = f"Here is your Vettan AI research report. {text.strip()}"
         
         return text
     
+    @classmethod
+    def _replace_markdown(cls, match: re.Match) -> str:
+        """Keep the inner text of inline markup, drop everything else"""
+        keep = cls._MARKDOWN_KEEP.get(match.lastgroup)
+        return match.group(keep) if keep else ''
+    
     def estimate_cost(self, text: str) -> float:
         """Estimate cost for full text"""
         char_count = min(len(text), self.RECOMMENDED_MAX)
@@ -0,0 +1,44 @@
+-- Semantic cache tier for research_sessions
+-- Stores the query embedding (text-embedding-3-small, 1536 dims) so
+-- paraphrased queries can reuse a stored report via nearest-neighbour search.
+
+CREATE EXTENSION IF NOT EXISTS vector;
+
+ALTER TABLE research_sessions
+  ADD COLUMN IF NOT EXISTS embedding vector(1536);
+
+CREATE INDEX IF NOT EXISTS idx_research_sessions_embedding
+  ON research_sessions
+  USING ivfflat (embedding vector_cosine_ops)
+  WITH (lists = 100);
+
+-- Nearest stored query above a cosine-similarity threshold
+CREATE OR REPLACE FUNCTION match_research_session(
+  query_embedding vector(1536),
+  match_threshold float DEFAULT 0.92
+)
+RETURNS TABLE (
+  id uuid,
+  query text,
+  report text,
+  citations jsonb,
+  metadata jsonb,
+  created_at timestamptz,
+  similarity float
+)
+LANGUAGE sql STABLE
+AS $$
+  SELECT
+    rs.id,
+    rs.query,
+    rs.report,
+    rs.citations,
+    rs.metadata,
+    rs.created_at,
+    1 - (rs.embedding <=> query_embedding) AS similarity
+  FROM research_sessions rs
+  WHERE rs.embedding IS NOT NULL
+    AND 1 - (rs.embedding <=> query_embedding) >= match_threshold
+  ORDER BY rs.embedding <=> query_embedding
+  LIMIT 1;
+$$;
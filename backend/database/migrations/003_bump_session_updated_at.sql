@@ -0,0 +1,21 @@
+-- Keep research_sessions.updated_at current whenever a message is added,
+-- so add_message needs a single INSERT instead of INSERT + UPDATE.
+
+CREATE OR REPLACE FUNCTION bump_session_updated_at()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  UPDATE research_sessions
+  SET updated_at = now()
+  WHERE id = NEW.session_id;
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS messages_bump_session ON messages;
+
+CREATE TRIGGER messages_bump_session
+  AFTER INSERT ON messages
+  FOR EACH ROW
+  EXECUTE FUNCTION bump_session_updated_at();
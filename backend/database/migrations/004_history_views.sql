@@ -0,0 +1,23 @@
+-- Read-side views for history endpoints: defaults are coalesced and JSON
+-- columns come back as jsonb, so the client returns rows as-is.
+
+CREATE OR REPLACE VIEW research_sessions_v AS
+SELECT
+  id,
+  query,
+  created_at,
+  COALESCE(updated_at, created_at) AS updated_at,
+  COALESCE(is_favorite, false) AS is_favorite,
+  COALESCE(metadata::jsonb, '{}'::jsonb) AS metadata
+FROM research_sessions;
+
+CREATE OR REPLACE VIEW messages_v AS
+SELECT
+  id,
+  session_id,
+  role,
+  content,
+  COALESCE(citations::jsonb, '[]'::jsonb) AS citations,
+  COALESCE(metadata::jsonb, '{}'::jsonb) AS metadata,
+  created_at
+FROM messages;
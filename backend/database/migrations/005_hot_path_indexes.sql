@@ -0,0 +1,17 @@
+-- Composite indexes for the hot read paths:
+--   check_cache:              WHERE query_hash = ? ORDER BY created_at DESC LIMIT 1
+--   get_conversation_history: WHERE session_id = ? ORDER BY created_at ASC
+--   get_recent_sessions:      ORDER BY updated_at DESC LIMIT n, where
+--                             research_sessions_v.updated_at is
+--                             COALESCE(updated_at, created_at)
+
+CREATE INDEX IF NOT EXISTS idx_rs_hash_created
+  ON research_sessions (query_hash, created_at DESC);
+
+CREATE INDEX IF NOT EXISTS idx_msgs_session_created
+  ON messages (session_id, created_at);
+
+CREATE INDEX IF NOT EXISTS idx_rs_recent
+  ON research_sessions ((COALESCE(updated_at, created_at)) DESC);
+
+DROP INDEX IF EXISTS idx_rs_updated;
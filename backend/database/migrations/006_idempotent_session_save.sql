@@ -0,0 +1,55 @@
+-- Make save_session_with_messages idempotent on the session id.
+-- Callers pre-generate the id (background saves), so a replayed or
+-- concurrent save of the same session collapses onto the first write
+-- instead of duplicating the session or its opening messages.
+
+CREATE OR REPLACE FUNCTION save_session_with_messages(
+  session jsonb,
+  user_msg jsonb,
+  assistant_msg jsonb
+)
+RETURNS uuid
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  new_session_id uuid := (session->>'id')::uuid;
+BEGIN
+  INSERT INTO research_sessions (
+    id, query, query_hash, report, citations, metadata,
+    is_favorite, embedding, created_at, updated_at
+  )
+  VALUES (
+    new_session_id,
+    session->>'query',
+    session->>'query_hash',
+    session->>'report',
+    COALESCE(session->'citations', '[]'::jsonb),
+    COALESCE(session->'metadata', '{}'::jsonb),
+    COALESCE((session->>'is_favorite')::boolean, false),
+    (session->>'embedding')::vector,
+    COALESCE((session->>'created_at')::timestamptz, now()),
+    COALESCE((session->>'updated_at')::timestamptz, now())
+  )
+  ON CONFLICT (id) DO NOTHING;
+
+  -- Already saved: the thread exists too
+  IF NOT FOUND THEN
+    RETURN new_session_id;
+  END IF;
+
+  INSERT INTO messages (id, session_id, role, content, citations, metadata, created_at)
+  SELECT
+    (msg->>'id')::uuid,
+    new_session_id,
+    msg->>'role',
+    msg->>'content',
+    COALESCE(msg->'citations', '[]'::jsonb),
+    COALESCE(msg->'metadata', '{}'::jsonb),
+    COALESCE((msg->>'created_at')::timestamptz, now())
+  FROM (VALUES (user_msg, 1), (assistant_msg, 2)) AS m(msg, ord)
+  ORDER BY ord
+  ON CONFLICT (id) DO NOTHING;
+
+  RETURN new_session_id;
+END;
+$$;
@@ -0,0 +1,29 @@
+-- Drop null-valued keys from citations/metadata on write, so clients can
+-- send their payloads unchanged instead of cleaning every dict first.
+-- The columns are not guaranteed to be jsonb (see the casts in 004), so
+-- cast before stripping and let assignment cast back to the column type.
+
+CREATE OR REPLACE FUNCTION strip_json_nulls()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  NEW.citations := jsonb_strip_nulls(NEW.citations::jsonb);
+  NEW.metadata := jsonb_strip_nulls(NEW.metadata::jsonb);
+  RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS research_sessions_strip_nulls ON research_sessions;
+
+CREATE TRIGGER research_sessions_strip_nulls
+  BEFORE INSERT ON research_sessions
+  FOR EACH ROW
+  EXECUTE FUNCTION strip_json_nulls();
+
+DROP TRIGGER IF EXISTS messages_strip_nulls ON messages;
+
+CREATE TRIGGER messages_strip_nulls
+  BEFORE INSERT ON messages
+  FOR EACH ROW
+  EXECUTE FUNCTION strip_json_nulls();
@@ -3,12 +3,21 @@ Production-grade Supabase client with connection pooling and retry logic
 """
 
 from supabase import create_client, Client
+from supabase.lib.client_options import ClientOptions
+from postgrest.utils import SyncClient
+from postgrest.types import ReturnMethod
+import httpx
+import asyncio
 import os
+import socket
+import threading
+from cachetools import TTLCache
 import hashlib
 from typing import Optional, Dict, List, Any
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 import time
-import json
+import random
+import orjson
 import uuid
 from dotenv import load_dotenv
 
@@ -18,6 +27,46 @@ logger = logging.getLogger(__name__)
 
 load_dotenv()
 
+# Keep PostgREST connections (HTTP/2) alive between requests instead of
+# re-doing the TLS handshake after httpx's 5s default idle expiry
+POOL_LIMITS = httpx.Limits(
+    max_connections=20,
+    max_keepalive_connections=10,
+    keepalive_expiry=1800
+)
+
+# TCP keepalive so idle pooled sockets aren't silently dropped by NATs/LBs
+SOCKET_OPTIONS = [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+
+# In-flight PostgREST requests per process (HTTP/2 multiplexes past
+# POOL_LIMITS, so bursts are capped here to stay under the Supabase pooler)
+MAX_CONCURRENT_REQUESTS = 12
+
+
+class _BoundedTransport(httpx.HTTPTransport):
+    """HTTP transport that queues requests beyond a concurrency limit"""
+    
+    def __init__(self, max_concurrent: int, **kwargs: Any):
+        super().__init__(**kwargs)
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+    
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        with self._slots:
+            return super().handle_request(request)
+
+
+# Columns read back for a session; never the 1536-dim embedding
+SESSION_COLUMNS = ['id', 'query', 'report', 'citations', 'metadata', 'is_favorite', 'created_at', 'updated_at']
+CACHE_COLUMNS = 'id, query, report, citations, metadata, created_at'
+
+# In-process exact-match tier in front of check_cache (repeat queries in the
+# same worker skip PostgREST entirely)
+CACHE_MEMO_SIZE = 10_000
+CACHE_MEMO_TTL = 300
+
+# Seconds a successful health probe is trusted (liveness probes hit this often)
+HEALTH_CHECK_TTL = 5
+
 
 class VettanDatabaseV2:
     """
@@ -45,6 +94,14 @@ class VettanDatabaseV2:
         self.client: Optional[Client] = None
         self.is_connected = False
         
+        # (query_hash, max_age_seconds) -> cached session row
+        self._cache: TTLCache = TTLCache(maxsize=CACHE_MEMO_SIZE, ttl=CACHE_MEMO_TTL)
+        self._cache_lock = threading.Lock()
+        
+        # Last successful health probe (monotonic); probes within the TTL reuse it
+        self._last_health_ok: float = 0.0
+        self._health_ttl = HEALTH_CHECK_TTL
+        
         # Initialize connection
         self._connect()
     
@@ -59,61 +116,126 @@ class VettanDatabaseV2:
         key = os.getenv("SUPABASE_KEY")
         
         if not url or not key:
-            print("⚠️ SUPABASE_URL or SUPABASE_KEY not found - running without database")
+            logger.warning("⚠️ SUPABASE_URL or SUPABASE_KEY not found - running without database")
             self.is_connected = False
             return False
         
         # Validate URL format
         if not url.startswith(('http://', 'https://')):
-            print(f"❌ Invalid SUPABASE_URL format: {url}")
+            logger.error("❌ Invalid SUPABASE_URL format: %s", url)
             self.is_connected = False
             return False
         
-        # Retry logic with exponential backoff
+        # Retry logic with decorrelated-jitter backoff (workers restarting
+        # together don't reconnect in lockstep)
+        wait_time = 0.0
         for attempt in range(1, self.max_retries + 1):
             try:
-                print(f"🔄 Connecting to Supabase (attempt {attempt}/{self.max_retries})...")
+                logger.info("🔄 Connecting to Supabase (attempt %d/%d)...", attempt, self.max_retries)
                 
                 # Create client
-                self.client = create_client(url, key)
+                self.client = create_client(
+                    url,
+                    key,
+                    options=ClientOptions(postgrest_client_timeout=self.timeout)
+                )
+                self._configure_pool()
                 
                 # Test connection
                 self.client.table('research_sessions').select('id').limit(1).execute()
                 
-                print(f"✅ Connected to Supabase: {url}")
+                logger.info("✅ Connected to Supabase: %s", url)
                 self.is_connected = True
                 return True
                 
             except Exception as e:
-                wait_time = 2 ** attempt  # Exponential backoff: 2, 4, 8 seconds
-                print(f"❌ Connection attempt {attempt} failed: {str(e)[:100]}")
+                wait_time = random.uniform(0.5, min(30, wait_time * 3 if attempt > 1 else 2))
+                logger.warning("❌ Connection attempt %d failed: %.100s", attempt, e)
                 
                 if attempt < self.max_retries:
-                    print(f"⏳ Retrying in {wait_time}s...")
+                    logger.info("⏳ Retrying in %.1fs...", wait_time)
                     time.sleep(wait_time)
                 else:
-                    print(f"❌ Failed to connect after {self.max_retries} attempts")
-                    print(f"⚠️ Running in degraded mode (no caching/history)")
+                    logger.error("❌ Failed to connect after %d attempts", self.max_retries)
+                    logger.warning("⚠️ Running in degraded mode (no caching/history)")
                     self.is_connected = False
                     return False
     
+    def _configure_pool(self) -> None:
+        """Replace PostgREST's default HTTP session with a keep-alive tuned pool"""
+        postgrest = self.client.postgrest
+        default_session = postgrest.session
+        
+        postgrest.session = SyncClient(
+            base_url=default_session.base_url,
+            headers=default_session.headers,
+            timeout=httpx.Timeout(self.timeout, connect=5.0),
+            follow_redirects=True,
+            transport=_BoundedTransport(
+                MAX_CONCURRENT_REQUESTS,
+                http2=True,
+                limits=POOL_LIMITS,
+                socket_options=SOCKET_OPTIONS
+            )
+        )
+        default_session.close()
+    
     @staticmethod
-    def generate_query_hash(query: str) -> str:
-        """Generate MD5 hash for caching"""
-        normalized = query.lower().strip()
-        return hashlib.md5(normalized.encode()).hexdigest()
+    def generate_query_hash(
+        query: str,
+        window: Optional[str] = None,
+        params: Optional[List[str]] = None
+    ) -> str:
+        """
+        Generate BLAKE2b hash for caching (16-byte digest, same 32 hex chars as MD5)
+        
+        Resolved time window and parameter tokens are folded into the key so
+        "news today" and "Chiller 6" style queries never share an entry.
+        Without them the hash is unchanged from the plain-query form.
+        """
+        normalized = " ".join(query.lower().split())
+        if window or params:
+            normalized = f"{normalized}|{window or ''}|{','.join(params or [])}"
+        return hashlib.blake2b(normalized.encode(), digest_size=16).hexdigest()
     
-    def check_cache(self, query: str) -> Optional[Dict[str, Any]]:
-        """Check cache with connection validation"""
+    def check_cache(
+        self,
+        query: str,
+        window: Optional[str] = None,
+        params: Optional[List[str]] = None,
+        max_age_seconds: Optional[int] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Check cache with connection validation
+        
+        Args:
+            query: Normalized query text
+            window: Resolved absolute time window (e.g. "2025-10-01..2025-10-07")
+            params: Numeric/entity tokens extracted from the query
+            max_age_seconds: Ignore entries older than this
+        """
         if not self.is_connected or not self.client:
             return None
         
-        query_hash = self.generate_query_hash(query)
+        query_hash = self.generate_query_hash(query, window, params)
+        memo_key = (query_hash, max_age_seconds)
+        
+        with self._cache_lock:
+            memo = self._cache.get(memo_key)
+        if memo:
+            logger.debug("✅ Cache HIT (memory): %.50s", query)
+            return memo
         
         try:
-            response = self.client.table('research_sessions') \
-                .select('*') \
-                .eq('query_hash', query_hash) \
+            request = self.client.table('research_sessions') \
+                .select(CACHE_COLUMNS) \
+                .eq('query_hash', query_hash)
+            
+            if max_age_seconds:
+                cutoff = datetime.now(timezone.utc) - timedelta(seconds=max_age_seconds)
+                request = request.gte('created_at', cutoff.isoformat())
+            
+            response = request \
                 .order('created_at', desc=True) \
                 .limit(1) \
                 .execute()
@@ -126,19 +248,75 @@ class VettanDatabaseV2:
                 # Parse JSON fields safely
                 try:
                     if isinstance(cached.get('citations'), str):
-                        cached['citations'] = json.loads(cached['citations'])
+                        cached['citations'] = orjson.loads(cached['citations'])
                     if isinstance(cached.get('metadata'), str):
-                        cached['metadata'] = json.loads(cached['metadata'])
-                except json.JSONDecodeError:
+                        cached['metadata'] = orjson.loads(cached['metadata'])
+                except orjson.JSONDecodeError:
                     pass
                 
-                print(f"✅ Cache HIT: {query[:50]}")
+                with self._cache_lock:
+                    self._cache[memo_key] = cached
+                
+                logger.debug("✅ Cache HIT: %.50s", query)
                 return cached
             
             return None
             
         except Exception as e:
-            print(f"⚠️ Cache check failed: {e}")
+            logger.warning("⚠️ Cache check failed: %s", e)
+            return None
+    
+    def _invalidate_cache(self, query_hash: str) -> None:
+        """Drop memoized rows for a query so the newest saved session wins"""
+        with self._cache_lock:
+            for key in [k for k in self._cache if k[0] == query_hash]:
+                self._cache.pop(key, None)
+    
+    def semantic_check_cache(
+        self,
+        query_embedding: List[float],
+        threshold: float = 0.92
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Find the nearest cached session by query embedding (pgvector)
+        
+        Args:
+            query_embedding: Embedding of the incoming query
+            threshold: Minimum cosine similarity for a hit
+        
+        Returns:
+            Closest session above threshold, None otherwise
+        """
+        if not self.is_connected or not self.client:
+            return None
+        
+        try:
+            response = self.client.rpc('match_research_session', {
+                'query_embedding': query_embedding,
+                'match_threshold': threshold
+            }).execute()
+            
+            data: List[Dict[str, Any]] = response.data  # type: ignore
+            
+            if data and len(data) > 0:
+                cached = data[0]
+                
+                # Parse JSON fields safely
+                try:
+                    if isinstance(cached.get('citations'), str):
+                        cached['citations'] = orjson.loads(cached['citations'])
+                    if isinstance(cached.get('metadata'), str):
+                        cached['metadata'] = orjson.loads(cached['metadata'])
+                except orjson.JSONDecodeError:
+                    pass
+                
+                logger.debug("✅ Semantic cache HIT (sim=%.3f): %.50s", cached.get('similarity', 0), cached.get('query', ''))
+                return cached
+            
+            return None
+        
+        except Exception as e:
+            logger.warning("⚠️ Semantic cache check failed: %s", e)
             return None
     
     def save_session(
@@ -146,33 +324,31 @@ class VettanDatabaseV2:
         query: str,
         report: str,
         citations: List[Dict[str, Any]],
-        metadata: Dict[str, Any]
+        metadata: Dict[str, Any],
+        embedding: Optional[List[float]] = None,
+        window: Optional[str] = None,
+        params: Optional[List[str]] = None,
+        session_id: Optional[str] = None
     ) -> Optional[str]:
         """
         Save session with validation AND create initial messages
         
-        This now creates:
+        One save_session_with_messages RPC (migration 002) creates:
         1. The research_sessions entry
         2. User message (the query)
         3. Assistant message (the report)
         """
         if not self.is_connected or not self.client:
-            print("⚠️ Database not connected - skipping save")
+            logger.warning("⚠️ Database not connected - skipping save")
             return None
         
-        query_hash = self.generate_query_hash(query)
+        query_hash = self.generate_query_hash(query, window, params)
         
         try:
-            # Clean data
-            clean_citations = [
-                {k: v for k, v in cite.items() if v is not None}
-                for cite in citations
-            ]
-            
-            clean_metadata = {k: v for k, v in metadata.items() if v is not None}
-            
-            # Generate session ID
-            session_id = str(uuid.uuid4())
+            # Generate session ID (callers may pre-generate it for async saves)
+            session_id = session_id or str(uuid.uuid4())
+            now = datetime.now(timezone.utc)
+            now_iso = now.isoformat()  # Shared by the session row and the user message
             
             # Prepare session data
             data = {
@@ -180,51 +356,49 @@ class VettanDatabaseV2:
                 'query': query[:1000],
                 'query_hash': query_hash,
                 'report': report[:50000],
-                'citations': clean_citations,
-                'metadata': clean_metadata,
+                'citations': citations,  # Nulls stripped by trigger (migration 007)
+                'metadata': metadata,
                 'is_favorite': False,
-                'created_at': datetime.now().isoformat(),
-                'updated_at': datetime.now().isoformat()
+                'created_at': now_iso,
+                'updated_at': now_iso
             }
             
-            # Save session
-            response = self.client.table('research_sessions').insert(data).execute()
+            # Store query embedding for the semantic cache tier
+            if embedding:
+                data['embedding'] = embedding
             
-            result_data: List[Dict[str, Any]] = response.data  # type: ignore
+            # Initial conversation thread (user query, then assistant report)
+            user_msg = {
+                'id': str(uuid.uuid4()),
+                'role': 'user',
+                'content': query[:50000],
+                'created_at': now_iso
+            }
+            assistant_msg = {
+                'id': str(uuid.uuid4()),
+                'role': 'assistant',
+                'content': report[:50000],
+                'citations': citations,
+                'metadata': metadata,
+                'created_at': (now + timedelta(microseconds=1)).isoformat()
+            }
             
-            if result_data and len(result_data) > 0:
-                print(f"✅ Saved session: {session_id[:8]}")
-                
-                # Create initial messages for conversation thread
-                try:
-                    # 1. User query message
-                    self.add_message(
-                        session_id=session_id,
-                        role='user',
-                        content=query
-                    )
-                    
-                    # 2. Assistant response message
-                    self.add_message(
-                        session_id=session_id,
-                        role='assistant',
-                        content=report,
-                        citations=clean_citations,
-                        metadata=clean_metadata
-                    )
-                    
-                    print(f"✅ Created initial conversation thread for {session_id[:8]}")
-                except Exception as msg_error:
-                    print(f"⚠️ Failed to create initial messages (non-critical): {msg_error}")
-                
+            # Session + both messages in one transaction (single round trip)
+            response = self.client.rpc('save_session_with_messages', {
+                'session': data,
+                'user_msg': user_msg,
+                'assistant_msg': assistant_msg
+            }).execute()
+            
+            if response.data:
+                self._invalidate_cache(query_hash)
+                logger.debug("✅ Saved session with initial conversation thread: %.8s", session_id)
                 return session_id
             
             return None
             
         except Exception as e:
-            print(f"⚠️ Save failed (non-critical): {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("⚠️ Save failed (non-critical): %s", e)
             return None
     
     def add_message(
@@ -249,7 +423,7 @@ class VettanDatabaseV2:
             Message ID if successful, None otherwise
         """
         if not self.is_connected or not self.client:
-            print("⚠️ Database not connected - cannot save message")
+            logger.warning("⚠️ Database not connected - cannot save message")
             return None
         
         try:
@@ -262,7 +436,7 @@ class VettanDatabaseV2:
                 'content': content[:50000],
                 'citations': citations or [],
                 'metadata': metadata or {},
-                'created_at': datetime.now().isoformat()
+                'created_at': datetime.now(timezone.utc).isoformat()
             }
             
             response = self.client.table('messages').insert(message_data).execute()
@@ -270,24 +444,14 @@ class VettanDatabaseV2:
             result_data: List[Dict[str, Any]] = response.data  # type: ignore
             
             if result_data and len(result_data) > 0:
-                print(f"💬 Message added: {role} in session {session_id[:8]}")
-                
-                # Update session's updated_at timestamp
-                try:
-                    self.client.table('research_sessions').update({
-                        'updated_at': datetime.now().isoformat()
-                    }).eq('id', session_id).execute()
-                except Exception as update_err:
-                    print(f"⚠️ Failed to update session timestamp (non-critical): {update_err}")
-                
+                # Session's updated_at is bumped by the messages_bump_session trigger
+                logger.debug("💬 Message added: %s in session %.8s", role, session_id)
                 return message_id
             
             return None
             
         except Exception as e:
-            print(f"⚠️ Failed to add message: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("⚠️ Failed to add message: %s", e)
             return None
     
     def get_conversation_history(self, session_id: str) -> List[Dict[str, Any]]:
@@ -301,13 +465,14 @@ class VettanDatabaseV2:
             List of messages with role, content, citations, metadata
         """
         if not self.is_connected or not self.client:
-            print("⚠️ Database not connected - cannot retrieve messages")
+            logger.warning("⚠️ Database not connected - cannot retrieve messages")
             return []
         
         try:
-            print(f"💬 Fetching conversation history for session: {session_id[:8]}")
+            logger.debug("💬 Fetching conversation history for session: %.8s", session_id)
             
-            response = self.client.table('messages') \
+            # messages_v (migration 004) returns citations/metadata as jsonb with defaults
+            response = self.client.from_('messages_v') \
                 .select('*') \
                 .eq('session_id', session_id) \
                 .order('created_at', desc=False) \
@@ -316,109 +481,70 @@ class VettanDatabaseV2:
             data: List[Dict[str, Any]] = response.data  # type: ignore
             
             if not data:
-                print(f"ℹ️ No messages found for session {session_id[:8]}")
+                logger.debug("ℹ️ No messages found for session %.8s", session_id)
                 return []
             
-            # Parse JSON fields safely
-            parsed_messages = []
-            for message in data:
-                try:
-                    if isinstance(message.get('citations'), str):
-                        message['citations'] = json.loads(message['citations'])
-                    if isinstance(message.get('metadata'), str):
-                        message['metadata'] = json.loads(message['metadata'])
-                    parsed_messages.append(message)
-                except json.JSONDecodeError as e:
-                    print(f"⚠️ JSON parse error in message: {e}")
-                    parsed_messages.append(message)
-            
-            print(f"✅ Retrieved {len(parsed_messages)} messages for session {session_id[:8]}")
-            return parsed_messages
+            logger.debug("✅ Retrieved %d messages for session %.8s", len(data), session_id)
+            return data
             
         except Exception as e:
-            print(f"❌ Failed to get conversation history: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("❌ Failed to get conversation history: %s", e)
             return []
     
     def get_recent_sessions(self, limit: int = 10) -> List[Dict[str, Any]]:
         """Get recent sessions with robust error handling"""
         if not self.is_connected or not self.client:
-            print("⚠️ Database not connected")
+            logger.warning("⚠️ Database not connected")
             return []
         
         try:
-            print(f"📚 Fetching {limit} recent sessions...")
-            
-            # Try with updated_at, fallback to created_at
-            try:
-                response = self.client.table('research_sessions') \
-                    .select('id, query, created_at, updated_at, metadata, is_favorite') \
-                    .order('updated_at', desc=True) \
-                    .limit(limit) \
-                    .execute()
-                print("✅ Using updated_at for ordering")
-            except Exception as order_error:
-                print(f"⚠️ updated_at failed, using created_at: {order_error}")
-                response = self.client.table('research_sessions') \
-                    .select('id, query, created_at, metadata, is_favorite') \
-                    .order('created_at', desc=True) \
-                    .limit(limit) \
-                    .execute()
+            logger.debug("📚 Fetching %d recent sessions...", limit)
+            
+            # research_sessions_v (migration 004) coalesces updated_at/is_favorite;
+            # only the sidebar's scalar metadata keys are extracted server-side
+            response = self.client.from_('research_sessions_v') \
+                .select(
+                    'id, query, created_at, updated_at, is_favorite, '
+                    'sources_count:metadata->sources_count, pipeline:metadata->>pipeline'
+                ) \
+                .order('updated_at', desc=True) \
+                .limit(limit) \
+                .execute()
             
             data: List[Dict[str, Any]] = response.data  # type: ignore
             
             if not data:
-                print("ℹ️ No sessions found in database")
+                logger.debug("ℹ️ No sessions found in database")
                 return []
             
-            print(f"📊 Raw data retrieved: {len(data)} sessions")
+            logger.debug("✅ Retrieved %d sessions for history", len(data))
             
-            # Parse JSON fields
-            parsed_sessions = []
-            for session in data:
-                try:
-                    if isinstance(session.get('metadata'), str):
-                        session['metadata'] = json.loads(session['metadata'])
-                    
-                    if 'is_favorite' not in session:
-                        session['is_favorite'] = False
-                    
-                    if 'updated_at' not in session and 'created_at' in session:
-                        session['updated_at'] = session['created_at']
-                    
-                    parsed_sessions.append(session)
-                    
-                except Exception as parse_error:
-                    print(f"⚠️ Parse error: {parse_error}")
-                    if 'is_favorite' not in session:
-                        session['is_favorite'] = False
-                    parsed_sessions.append(session)
-            
-            print(f"✅ Retrieved {len(parsed_sessions)} sessions for history")
-            
-            if parsed_sessions:
-                first = parsed_sessions[0]
-                print(f"📝 First session: {first.get('query', 'N/A')[:50]}")
-            
-            return parsed_sessions
+            return data
             
         except Exception as e:
-            print(f"❌ Get sessions failed: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("❌ Get sessions failed: %s", e)
             return []
     
-    def get_session_by_id(self, session_id: str) -> Optional[Dict[str, Any]]:
-        """Get a specific session by ID"""
+    def get_session_by_id(
+        self,
+        session_id: str,
+        fields: Optional[List[str]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Get a specific session by ID
+        
+        Args:
+            session_id: UUID of the session
+            fields: Columns to fetch (defaults to SESSION_COLUMNS)
+        """
         if not self.is_connected or not self.client:
             return None
         
         try:
-            print(f"🔍 Fetching session by ID: {session_id}")
+            logger.debug("🔍 Fetching session by ID: %s", session_id)
             
             response = self.client.table('research_sessions') \
-                .select('*') \
+                .select(', '.join(fields or SESSION_COLUMNS)) \
                 .eq('id', session_id) \
                 .single() \
                 .execute()
@@ -426,25 +552,23 @@ class VettanDatabaseV2:
             data: Dict[str, Any] = response.data  # type: ignore
             
             if not data:
-                print(f"❌ Session not found: {session_id}")
+                logger.warning("❌ Session not found: %s", session_id)
                 return None
             
             # Parse JSON fields safely
             try:
                 if isinstance(data.get('citations'), str):
-                    data['citations'] = json.loads(data['citations'])
+                    data['citations'] = orjson.loads(data['citations'])
                 if isinstance(data.get('metadata'), str):
-                    data['metadata'] = json.loads(data['metadata'])
-            except json.JSONDecodeError as e:
-                print(f"⚠️ JSON parse error: {e}")
+                    data['metadata'] = orjson.loads(data['metadata'])
+            except orjson.JSONDecodeError as e:
+                logger.warning("⚠️ JSON parse error: %s", e)
             
-            print(f"✅ Session retrieved: {session_id[:8]}")
+            logger.debug("✅ Session retrieved: %.8s", session_id)
             return data
             
         except Exception as e:
-            print(f"❌ Get session by ID failed: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("❌ Get session by ID failed: %s", e)
             return None
     
     def update_session(self, session_id: str, update_data: dict) -> bool:
@@ -464,34 +588,29 @@ class VettanDatabaseV2:
         
         try:
             if not session_id or len(session_id) < 8:
-                logger.error(f"Invalid session_id: {session_id}")
+                logger.error("Invalid session_id: %s", session_id)
                 return False
             
             # Add updated_at timestamp
-            update_data['updated_at'] = datetime.now().isoformat()
+            update_data['updated_at'] = datetime.now(timezone.utc).isoformat()
             
-            print(f"✏️ Updating session: {session_id[:8]}... with {update_data}")
+            logger.debug("✏️ Updating session: %.8s... with %s", session_id, update_data)
             
+            # Updated row comes back in the same round trip - it is the existence check
             result = self.client.table('research_sessions') \
-                .update(update_data) \
+                .update(update_data, returning=ReturnMethod.representation) \
                 .eq('id', session_id) \
                 .execute()
             
             if not result.data:
-                logger.warning(f"❌ Session not found for update: {session_id}")
-                print(f"❌ Session not found: {session_id}")
+                logger.warning("❌ Session not found for update: %s", session_id)
                 return False
             
-            logger.info(f"✅ Session updated: {session_id[:8]}... with {update_data}")
-            print(f"✅ Session updated: {session_id[:8]}")
+            logger.info("✅ Session updated: %.8s... with %s", session_id, update_data)
             return True
             
         except Exception as e:
-            logger.error(f"❌ Failed to update session {session_id[:8]}: {str(e)}")
-            logger.exception(e)
-            print(f"❌ Update failed: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("❌ Failed to update session %.8s: %s", session_id, e)
             return False
     
     def delete_session(self, session_id: str) -> bool:
@@ -510,51 +629,44 @@ class VettanDatabaseV2:
         
         try:
             if not session_id or len(session_id) < 8:
-                logger.error(f"Invalid session_id: {session_id}")
+                logger.error("Invalid session_id: %s", session_id)
                 return False
             
-            print(f"🗑️ Deleting session: {session_id[:8]}...")
+            logger.debug("🗑️ Deleting session: %.8s...", session_id)
             
-            # Delete messages first
-            try:
-                msg_result = self.client.table('messages') \
-                    .delete() \
-                    .eq('session_id', session_id) \
-                    .execute()
-                print(f"✅ Deleted {len(msg_result.data or [])} messages")
-            except Exception as msg_delete_err:
-                print(f"⚠️ Failed to delete messages (non-critical): {msg_delete_err}")
-            
-            # Delete session
+            # Delete session (messages go with it via ON DELETE CASCADE)
             result = self.client.table('research_sessions') \
-                .delete() \
+                .delete(returning=ReturnMethod.representation) \
                 .eq('id', session_id) \
                 .execute()
             
             if not result.data:
-                logger.warning(f"❌ Session not found for deletion: {session_id}")
-                print(f"❌ Session not found: {session_id}")
+                logger.warning("❌ Session not found for deletion: %s", session_id)
                 return False
             
-            logger.info(f"✅ Session deleted: {session_id[:8]}...")
-            print(f"✅ Session deleted: {session_id[:8]}")
+            # Don't let check_cache keep serving the deleted row from the memo
+            query_hash = result.data[0].get('query_hash')
+            if query_hash:
+                self._invalidate_cache(query_hash)
+            
+            logger.info("✅ Session deleted: %.8s...", session_id)
             return True
             
         except Exception as e:
-            logger.error(f"❌ Failed to delete session {session_id[:8]}: {str(e)}")
-            logger.exception(e)
-            print(f"❌ Delete failed: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("❌ Failed to delete session %.8s: %s", session_id, e)
             return False
     
     def health_check(self) -> bool:
-        """Check if database is healthy"""
+        """Check if database is healthy (cached for HEALTH_CHECK_TTL seconds after success)"""
         if not self.is_connected or not self.client:
             return False
         
+        if time.monotonic() - self._last_health_ok < self._health_ttl:
+            return True
+        
         try:
             self.client.table('research_sessions').select('id').limit(1).execute()
+            self._last_health_ok = time.monotonic()
             return True
         except:
             return False
@@ -563,26 +675,43 @@ class VettanDatabaseV2:
 # Singleton with lazy initialization
 _db_instance: Optional[VettanDatabaseV2] = None
 _db_initialized: bool = False
+_db_lock = threading.Lock()
 
 
 def get_database_v2() -> Optional[VettanDatabaseV2]:
     """
     Get database instance with lazy initialization
     Returns None if connection fails (graceful degradation)
+    
+    Double-checked locking: concurrent first callers share one client.
     """
     global _db_instance, _db_initialized
     
     if _db_initialized:
         return _db_instance
     
-    try:
-        _db_instance = VettanDatabaseV2(max_retries=3, timeout=10)
-        _db_initialized = True
-        return _db_instance if _db_instance.is_connected else None
-    except Exception as e:
-        print(f"❌ Database initialization failed: {e}")
-        import traceback
-        traceback.print_exc()
-        _db_initialized = True
-        _db_instance = None
-        return None
\ No newline at end of file
+    with _db_lock:
+        if _db_initialized:
+            return _db_instance
+        
+        try:
+            _db_instance = VettanDatabaseV2(max_retries=3, timeout=10)
+            _db_initialized = True
+            return _db_instance if _db_instance.is_connected else None
+        except Exception as e:
+            logger.exception("❌ Database initialization failed: %s", e)
+            _db_initialized = True
+            _db_instance = None
+            return None
+
+
+async def get_db() -> Optional[VettanDatabaseV2]:
+    """
+    FastAPI dependency for the shared database client
+    
+    The client is connected once (at startup) and its pooled HTTP transport
+    is shared by every request; only the first call pays a thread hop.
+    """
+    if _db_initialized:
+        return _db_instance
+    return await asyncio.to_thread(get_database_v2)
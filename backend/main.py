@@ -3,31 +3,132 @@ Vettan AI Backend - Production Grade
 Full conversation threading with context awareness
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Depends, Query
+from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse, Response
 from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
+from datetime import datetime, timezone
 import os
+import asyncio
+import uuid
+import hashlib
+import orjson
+from cachetools import LRUCache, TTLCache
 from dotenv import load_dotenv
 import logging
 
 load_dotenv()
 
 logging.basicConfig(
-    level=logging.INFO,
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),  # DEBUG in dev for per-query DB logs
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
 
-from agent.cached_research_agent import cached_research
-from agent.research_pipeline import research_complete, handle_followup
-from database.supabase_client_v2 import get_database_v2
+_BANNER = "=" * 60
+DEBUG_CONVERSATION = os.getenv("DEBUG_CONVERSATION", "").lower() in ("1", "true", "yes")  # Per-message thread dumps
+
+from agent.research_pipeline import research_complete, handle_followup, stream_followup, close_clients, stream_research_with_audio
+from database.supabase_client_v2 import VettanDatabaseV2, get_database_v2, get_db
 from audio.tts import get_tts
+from tools.scraper import close_scraper_clients
+
+# Finished audio per (voice, format, text), bounded by total bytes
+TTS_CACHE_BYTES = 256 << 20
+_tts_cache: LRUCache = LRUCache(maxsize=TTS_CACHE_BYTES, getsizeof=lambda entry: len(entry[0]))
+
+# Serialized /api/research responses for new conversations, per normalized query
+RESPONSE_CACHE_SIZE = 1024
+RESPONSE_CACHE_TTL = 300
+_response_cache: TTLCache = TTLCache(maxsize=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL)
+_response_keys: TTLCache = TTLCache(maxsize=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL)  # session_id -> key
+
+def _cache_response(session_id: str, response_key: bytes, body: bytes) -> None:
+    """Cache a response that points at a session known to exist"""
+    _response_cache[response_key] = body
+    _response_keys[session_id] = response_key
+
+def _evict_response(session_id: str) -> None:
+    """Drop the cached response pointing at a session (deleted, never saved, or continued)"""
+    response_key = _response_keys.pop(session_id, None)
+    if response_key is not None:
+        _response_cache.pop(response_key, None)
+
+# Write-behind queue for session writes: (session_id, db method, kwargs, future),
+# drained in order by one worker. Readers wait only on their own session's
+# latest queued write, never on the whole queue
+DB_WRITE_FLUSH_TIMEOUT = 30
+_db_write_queue: asyncio.Queue = asyncio.Queue()
+_pending_writes: Dict[str, asyncio.Future] = {}
+
+# Sessions whose creating save failed (their IDs were already handed out)
+_failed_saves: TTLCache = TTLCache(maxsize=4096, ttl=3600)
+
+def _queue_write(session_id: str, write, kwargs: Dict[str, Any]) -> asyncio.Future:
+    """Queue a DB write for a session; the future resolves to whether it succeeded"""
+    future = asyncio.get_running_loop().create_future()
+    _pending_writes[session_id] = future
+    _db_write_queue.put_nowait((session_id, write, kwargs, future))
+    return future
+
+async def _await_session_writes(session_id: str) -> None:
+    """
+    Wait for this session's queued writes (FIFO: the latest covers earlier ones)
+    
+    Raises HTTPException 503 when the session's own save failed.
+    """
+    pending = _pending_writes.get(session_id)
+    if pending is not None:
+        await asyncio.shield(pending)
+    
+    if session_id in _failed_saves:
+        raise HTTPException(status_code=503, detail="Session could not be saved - please run the research again")
+
+async def _db_writer_loop():
+    """Run queued DB writes one at a time, off the request path"""
+    while True:
+        session_id, write, kwargs, future = await _db_write_queue.get()
+        ok = False
+        try:
+            ok = bool(await asyncio.to_thread(write, **kwargs))
+            if not ok:
+                logger.warning("Background DB write returned nothing: %s", write.__name__)
+        except Exception as e:
+            logger.warning("Background DB write failed: %s", e)
+        finally:
+            if not ok and write.__name__ == 'save_session':
+                _failed_saves[session_id] = True
+                _evict_response(session_id)
+            if not future.done():
+                future.set_result(ok)
+            if _pending_writes.get(session_id) is future:
+                del _pending_writes[session_id]
+            _db_write_queue.task_done()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Connect once at startup instead of on the first request
+    await asyncio.to_thread(get_database_v2)
+    writer = asyncio.create_task(_db_writer_loop())
+    yield
+    
+    # Flush pending writes before shutting down
+    try:
+        await asyncio.wait_for(_db_write_queue.join(), timeout=DB_WRITE_FLUSH_TIMEOUT)
+    except asyncio.TimeoutError:
+        logger.warning("Shutdown with %s unsaved DB writes", _db_write_queue.qsize())
+    writer.cancel()
+    await close_clients()
+    await close_scraper_clients()
 
 app = FastAPI(
     title="Vettan AI API",
     version="5.0.0",
-    description="Enterprise AI Research Agent"
+    description="Enterprise AI Research Agent",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 cors_origins = os.getenv("CORS_ORIGINS", "http://localhost:3000").split(",")
@@ -38,6 +139,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Audio-Cost", "X-Length-Chars", "X-Cache"],
 )
 
 # ============================================
@@ -69,6 +171,11 @@ class ResearchResponse(BaseModel):
 class AudioRequest(BaseModel):
     text: str
     voice: str = "nova"
+    format: str = "mp3"  # mp3 | opus | aac
+
+class AudioResearchRequest(BaseModel):
+    query: str
+    voice: str = "nova"
 
 class UpdateSessionRequest(BaseModel):
     query: Optional[str] = None
@@ -80,14 +187,67 @@ class UpdateSessionRequest(BaseModel):
 # ENDPOINTS
 # ============================================
 
+async def _prepare_followup(db: VettanDatabaseV2, session_id: str, query: str) -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    Save the follow-up question; returns its message ID and the prior conversation
+    
+    Raises HTTPException when the message can't be saved or the session is empty.
+    """
+    # A just-created session (or its last answer) may still be queued
+    await _await_session_writes(session_id)
+    
+    # A cached response for this session would replay the thread without the new turns
+    _evict_response(session_id)
+    
+    # Independent round trips - run them concurrently
+    logger.info("Saving user message and loading conversation history...")
+    user_msg_id, conversation_history = await asyncio.gather(
+        asyncio.to_thread(
+            db.add_message,
+            session_id=session_id,
+            role='user',
+            content=query
+        ),
+        asyncio.to_thread(db.get_conversation_history, session_id)
+    )
+    
+    if not user_msg_id:
+        logger.error("Failed to save user message!")
+        raise HTTPException(status_code=500, detail="Failed to save message")
+    
+    logger.info("User message saved: %.8s", user_msg_id)
+    
+    # The follow-up pipeline appends the new question itself
+    conversation_history = [msg for msg in conversation_history if msg['id'] != user_msg_id]
+    
+    if not conversation_history:
+        logger.error("No history found for session: %.8s", session_id)
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    
+    logger.info("Context prepared with %s recent messages", len(conversation_history[-6:]))
+    return user_msg_id, conversation_history
+
+def _format_messages(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Thread messages in the response shape (plain dicts, serialized once by orjson)"""
+    return [
+        {
+            "id": msg['id'],
+            "role": msg['role'],
+            "content": msg['content'],
+            "citations": msg.get('citations') or [],
+            "metadata": msg.get('metadata') or {},
+            "created_at": msg['created_at']
+        }
+        for msg in messages
+    ]
+
 @app.get("/")
 async def root():
     return {"status": "Vettan AI Backend", "version": "5.0.0"}
 
 @app.get("/health")
-async def health_check():
+async def health_check(db: Optional[VettanDatabaseV2] = Depends(get_db)):
     try:
-        db = get_database_v2()
         db_status = db.is_connected if db else False
     except Exception:
         db_status = False
@@ -95,7 +255,7 @@ async def health_check():
 
 
 @app.post("/api/research", response_model=ResearchResponse)
-async def research(request: ResearchRequest):
+async def research(request: ResearchRequest, db: Optional[VettanDatabaseV2] = Depends(get_db)):
     """
     Main research endpoint with full conversation threading
     
@@ -105,52 +265,23 @@ async def research(request: ResearchRequest):
     - Uses OpenAI chat for follow-ups (faster, maintains context)
     """
     try:
-        db = get_database_v2()
-        
-        logger.info("="*60)
-        logger.info(f"REQUEST: {request.query[:80]}")
-        logger.info(f"Session: {request.session_id[:8] if request.session_id else 'NEW'}")
-        logger.info(f"Follow-up: {request.is_followup}")
-        logger.info("="*60)
+        logger.info(_BANNER)
+        logger.info("REQUEST: %.80s", request.query)
+        logger.info("Session: %.8s", request.session_id or 'NEW')
+        logger.info("Follow-up: %s", request.is_followup)
+        logger.info(_BANNER)
         
         # ============================================
         # FOLLOW-UP QUERY HANDLING
         # ============================================
         if request.session_id and request.is_followup:
-            logger.info(f"Processing follow-up in session: {request.session_id[:8]}")
+            logger.info("Processing follow-up in session: %.8s", request.session_id)
             
             if not db or not db.is_connected:
                 raise HTTPException(status_code=503, detail="Database required for follow-ups")
             
-            # STEP 1: Save user question
-            logger.info(f"Saving user message...")
-            user_msg_id = db.add_message(
-                session_id=request.session_id,
-                role='user',
-                content=request.query
-            )
-            
-            if not user_msg_id:
-                logger.error("Failed to save user message!")
-                raise HTTPException(status_code=500, detail="Failed to save message")
-            
-            logger.info(f"User message saved: {user_msg_id[:8]}")
-            
-            # STEP 2: Get conversation history FOR CONTEXT
-            logger.info(f"Loading conversation history...")
-            conversation_history = db.get_conversation_history(request.session_id)
-            
-            if not conversation_history:
-                logger.error(f"No history found for session: {request.session_id[:8]}")
-                raise HTTPException(status_code=404, detail="Conversation not found")
-            
-            # Format history as a context string for the agent
-            context_str = "\n".join([f"{msg['role']}: {msg['content']}" for msg in conversation_history[-6:]])
-            
-            # Augment query with context
-            augmented_query = f"Context:\n{context_str}\n\nNew Question: {request.query}"
-            
-            logger.info(f"Context prepared with {len(conversation_history[-6:])} recent messages")
+            # STEP 1 + 2: Save user question and load history FOR CONTEXT
+            user_msg_id, conversation_history = await _prepare_followup(db, request.session_id, request.query)
             
             # CALL RESEARCH AGENT instead of simple Chat
             # Use os.getenv for model to fix hardcoding (Fix #6)
@@ -165,65 +296,78 @@ async def research(request: ResearchRequest):
             
             # STEP 5: Save AI response
             logger.info("💾 Saving AI response...")
-            assistant_msg_id = db.add_message(
+            assistant_metadata = {
+                **metadata,
+                'is_followup': True
+            }
+            assistant_msg_id = await asyncio.to_thread(db.add_message,
                 session_id=request.session_id,
                 role='assistant',
                 content=ai_content,
                 citations=citations,
-                metadata={
-                    **metadata,
-                    'is_followup': True
-                }
+                metadata=assistant_metadata
             )
             
+            # STEP 6: COMPLETE conversation thread - the history already loaded
+            # plus the two messages just saved (re-fetched only if a save failed)
             if not assistant_msg_id:
                 logger.error("Failed to save assistant message!")
+                all_messages = await asyncio.to_thread(db.get_conversation_history, request.session_id)
             else:
-                logger.info(f"Assistant message saved: {assistant_msg_id[:8]}")
-            
-            # STEP 6: Get COMPLETE conversation thread
-            logger.info("Fetching complete conversation thread...")
-            all_messages = db.get_conversation_history(request.session_id)
+                logger.info("Assistant message saved: %.8s", assistant_msg_id)
+                now_iso = datetime.now(timezone.utc).isoformat()
+                all_messages = conversation_history + [
+                    {'id': user_msg_id, 'role': 'user', 'content': request.query, 'created_at': now_iso},
+                    {
+                        'id': assistant_msg_id,
+                        'role': 'assistant',
+                        'content': ai_content,
+                        'citations': citations,
+                        'metadata': assistant_metadata,
+                        'created_at': now_iso
+                    }
+                ]
             
             # STEP 7: Format for frontend
-            formatted_messages = [
-                Message(
-                    id=msg['id'],
-                    role=msg['role'],
-                    content=msg['content'],
-                    citations=msg.get('citations', []),
-                    metadata=msg.get('metadata', {}),
-                    created_at=msg['created_at']
-                )
-                for msg in all_messages
-            ]
+            formatted_messages = _format_messages(all_messages)
             
-            logger.info("="*60)
-            logger.info(f"FOLLOW-UP COMPLETE: Returning {len(formatted_messages)} messages")
-            logger.info("="*60)
+            logger.info(_BANNER)
+            logger.info("FOLLOW-UP COMPLETE: Returning %s messages", len(formatted_messages))
+            logger.info(_BANNER)
             
-            return ResearchResponse(
-                output=ai_content,
-                citations=citations,
-                metadata={
+            return ORJSONResponse({
+                "output": ai_content,
+                "citations": citations,
+                "metadata": {
                     **metadata,
                     'is_followup': True,
                     'message_count': len(formatted_messages)
                 },
-                session_id=request.session_id,
-                messages=formatted_messages
-            )
+                "session_id": request.session_id,
+                "messages": formatted_messages
+            })
         
         # ============================================
         # NEW CONVERSATION
         # ============================================
-        logger.info(f"NEW conversation: {request.query[:100]}")
+        logger.info("NEW conversation: %.100s", request.query)
+        
+        # Identical queries replay the serialized response (no DB, no LLM)
+        response_key = hashlib.blake2b(
+            ' '.join(request.query.lower().split()).encode(),
+            digest_size=16
+        ).digest()
+        if request.use_cache:
+            cached_body = _response_cache.get(response_key)
+            if cached_body:
+                logger.info("RESPONSE CACHE HIT")
+                return Response(content=cached_body, media_type="application/json", headers={"X-Cache": "HIT"})
         
         # Check cache first
         cached_result = None
         if db and request.use_cache:
             try:
-                cached_result = db.check_cache(request.query)
+                cached_result = await asyncio.to_thread(db.check_cache, request.query)
                 if cached_result:
                     report = cached_result.get('report', '')
                     if report and len(report) > 100 and 'stopped due to' not in report.lower():
@@ -240,28 +384,26 @@ async def research(request: ResearchRequest):
                     else:
                         cached_result = None
             except Exception as e:
-                logger.warning(f"Cache check failed: {e}")
+                logger.warning("Cache check failed: %s", e)
         
         # Cache miss — run new parallel pipeline
         if not cached_result:
             result = await research_complete(request.query)
             
-            # Save to database (creates session)
+            # Save to database (creates session) via the background writer;
+            # the ID is pre-generated so the response doesn't wait on the insert
             output = result.get('output', '')
             if db and db.is_connected and len(output) > 100:
-                try:
-                    new_session_id = db.save_session(
-                        query=request.query,
-                        report=output,
-                        citations=result.get('citations', []),
-                        metadata=result.get('metadata', {})
-                    )
-                    if new_session_id:
-                        result['metadata']['session_id'] = new_session_id
-                        result['metadata']['saved_to_db'] = True
-                        logger.info(f"Saved: {new_session_id[:8]}")
-                except Exception as e:
-                    logger.warning(f"Save failed: {e}")
+                new_session_id = str(uuid.uuid4())
+                _queue_write(new_session_id, db.save_session, {
+                    'query': request.query,
+                    'report': output,
+                    'citations': result.get('citations', []),
+                    'metadata': dict(result.get('metadata', {})),
+                    'session_id': new_session_id
+                })
+                result['metadata']['session_id'] = new_session_id
+                logger.info("Queued save: %.8s", new_session_id)
         
         session_id = result.get('metadata', {}).get('session_id', 'unknown')
         
@@ -269,92 +411,79 @@ async def research(request: ResearchRequest):
             logger.error("No session ID returned from research!")
             raise HTTPException(status_code=500, detail="Failed to create session")
         
-        logger.info(f"Session created: {session_id[:8]}")
+        logger.info("Session created: %.8s", session_id)
         
-        # Get initial messages (should be 2)
-        if db and db.is_connected:
-            all_messages = db.get_conversation_history(session_id)
-            logger.info(f"Loaded {len(all_messages)} initial messages")
+        # Get initial messages (should be 2) - a new session is still queued
+        # for saving, so its thread is built from the result instead
+        if db and db.is_connected and cached_result:
+            all_messages = await asyncio.to_thread(db.get_conversation_history, session_id)
+            logger.info("Loaded %s initial messages", len(all_messages))
             
-            formatted_messages = [
-                Message(
-                    id=msg['id'],
-                    role=msg['role'],
-                    content=msg['content'],
-                    citations=msg.get('citations', []),
-                    metadata=msg.get('metadata', {}),
-                    created_at=msg['created_at']
-                )
-                for msg in all_messages
-            ]
+            formatted_messages = _format_messages(all_messages)
         else:
-            logger.warning("Database unavailable, using fallback")
-            formatted_messages = [
-                Message(
-                    id='temp-user',
-                    role='user',
-                    content=request.query,
-                    created_at=''
-                ),
-                Message(
-                    id='temp-assistant',
-                    role='assistant',
-                    content=result['output'],
-                    citations=result.get('citations', []),
-                    metadata=result.get('metadata', {}),
-                    created_at=''
-                )
-            ]
+            if not db or not db.is_connected:
+                logger.warning("Database unavailable, using fallback")
+            formatted_messages = _format_messages([
+                {'id': 'temp-user', 'role': 'user', 'content': request.query, 'created_at': ''},
+                {
+                    'id': 'temp-assistant',
+                    'role': 'assistant',
+                    'content': result['output'],
+                    'citations': result.get('citations', []),
+                    'metadata': result.get('metadata', {}),
+                    'created_at': ''
+                }
+            ])
         
-        logger.info("="*60)
-        logger.info(f"NEW CONVERSATION COMPLETE: {len(formatted_messages)} messages")
-        logger.info("="*60)
+        logger.info(_BANNER)
+        logger.info("NEW CONVERSATION COMPLETE: %s messages", len(formatted_messages))
+        logger.info(_BANNER)
         
-        return ResearchResponse(
-            output=result['output'],
-            citations=result.get('citations', []),
-            metadata=result.get('metadata', {}),
-            session_id=session_id,
-            messages=formatted_messages
-        )
+        body = orjson.dumps({
+            "output": result['output'],
+            "citations": result.get('citations', []),
+            "metadata": result.get('metadata', {}),
+            "session_id": session_id,
+            "messages": formatted_messages
+        })
+        # Only cached once the session it points at is saved
+        if len(result['output']) > 100 and 'stopped due to' not in result['output'].lower():
+            pending = _pending_writes.get(session_id)
+            if pending is None:
+                _cache_response(session_id, response_key, body)
+            else:
+                pending.add_done_callback(
+                    lambda saved: saved.result() and _cache_response(session_id, response_key, body)
+                )
+        
+        return Response(content=body, media_type="application/json", headers={"X-Cache": "MISS"})
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"CRITICAL ERROR: {e}")
+        logger.error("CRITICAL ERROR: %s", e)
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/history/{session_id}/messages")
-async def get_session_messages(session_id: str):
+async def get_session_messages(session_id: str, db: Optional[VettanDatabaseV2] = Depends(get_db)):
     """Get all messages in conversation thread"""
     try:
-        logger.info(f"Fetching messages for session: {session_id[:8]}")
+        logger.info("Fetching messages for session: %.8s", session_id)
         
-        db = get_database_v2()
         if not db or not db.is_connected:
             raise HTTPException(status_code=503, detail="Database not connected")
         
-        messages = db.get_conversation_history(session_id)
+        messages = await asyncio.to_thread(db.get_conversation_history, session_id)
         
         if not messages:
-            logger.warning(f"No messages found for: {session_id[:8]}")
+            logger.warning("No messages found for: %.8s", session_id)
             return {"session_id": session_id, "messages": [], "count": 0}
         
-        logger.info(f"Found {len(messages)} messages")
+        logger.info("Found %s messages", len(messages))
         
-        formatted_messages = [
-            {
-                "id": msg['id'],
-                "role": msg['role'],
-                "content": msg['content'],
-                "citations": msg.get('citations', []),
-                "metadata": msg.get('metadata', {}),
-                "created_at": msg['created_at']
-            }
-            for msg in messages
-        ]
+        formatted_messages = _format_messages(messages)
         
         return {
             "session_id": session_id,
@@ -365,52 +494,145 @@ async def get_session_messages(session_id: str):
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Message fetch failed: {e}")
+        logger.error("Message fetch failed: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/audio")
-async def generate_audio(request: AudioRequest):
-    """Generate audio from text"""
+async def generate_audio(request: AudioRequest, response_type: str = Query("audio", alias="response")):
+    """
+    Generate audio from text
+    
+    Returns the raw audio bytes (cost in the X-Audio-Cost header);
+    `?response=json` returns the legacy base64 JSON payload instead
+    (`format` in the body is the audio codec).
+    """
     try:
         if not request.text:
             raise HTTPException(status_code=400, detail="No text provided")
         
-        logger.info(f"🎙️ Generating audio: {len(request.text)} chars, voice: {request.voice}")
+        logger.info("🎙️ Generating audio: %s chars, voice: %s, format: %s", len(request.text), request.voice, request.format)
         
         tts = get_tts()
-        speech_text = tts.prepare_text_for_speech(request.text)
-        audio_bytes = tts.generate_audio(text=speech_text, voice=request.voice)
-        
-        if not audio_bytes:
-            raise HTTPException(status_code=500, detail="Audio generation failed")
-        
-        import base64
-        audio_b64 = base64.b64encode(audio_bytes).decode('utf-8')
-        cost = tts.estimate_cost(speech_text)
-        
-        logger.info(f"Audio generated: {len(audio_bytes)} bytes")
+        if request.format not in tts.AUDIO_FORMATS:
+            raise HTTPException(status_code=400, detail=f"Unsupported audio format: {request.format}")
+        
+        # Replays of the same report skip cleanup and synthesis entirely
+        key = hashlib.blake2b(
+            f"{request.voice}|{request.format}|{request.text}".encode(),
+            digest_size=16
+        ).digest()
+        cached = _tts_cache.get(key)
+        if cached:
+            audio_bytes, length_chars, cost = cached
+            logger.info("Audio cache hit: %s bytes", len(audio_bytes))
+        else:
+            speech_text = tts.prepare_text_for_speech(request.text)
+            audio_bytes = await asyncio.to_thread(
+                tts.generate_audio,
+                text=speech_text,
+                voice=request.voice,
+                response_format=request.format
+            )
+            
+            if not audio_bytes:
+                raise HTTPException(status_code=500, detail="Audio generation failed")
+            
+            length_chars = len(speech_text)
+            cost = tts.estimate_cost(speech_text)
+            _tts_cache[key] = (audio_bytes, length_chars, cost)
+            logger.info("Audio generated: %s bytes", len(audio_bytes))
+        
+        mime_type = tts.AUDIO_FORMATS[request.format]
+        
+        if response_type == "json":
+            import base64
+            return {
+                "audio": base64.b64encode(audio_bytes).decode('utf-8'),
+                "cost": cost,
+                "length_chars": length_chars,
+                "voice": request.voice,
+                "format": request.format,
+                "mime_type": mime_type
+            }
         
-        return {
-            "audio": audio_b64,
-            "cost": cost,
-            "length_chars": len(speech_text),
-            "voice": request.voice,
-            "format": "mp3"
-        }
+        return Response(
+            content=audio_bytes,
+            media_type=mime_type,
+            headers={"X-Audio-Cost": str(cost), "X-Length-Chars": str(length_chars)}
+        )
         
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Audio generation failed: {e}")
+        logger.error("Audio generation failed: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/research/stream")
+async def research_followup_stream(request: ResearchRequest, db: Optional[VettanDatabaseV2] = Depends(get_db)):
+    """
+    Follow-up answer streamed as Server-Sent Events
+    
+    Each event is `data: <json>`: "text" deltas as the model decodes, then
+    "done" (session_id + metadata) or "error", then `data: [DONE]`.
+    The assistant message is persisted by the background DB writer.
+    """
+    if not request.session_id:
+        raise HTTPException(status_code=400, detail="session_id required for follow-ups")
+    
+    if not db or not db.is_connected:
+        raise HTTPException(status_code=503, detail="Database required for follow-ups")
+    
+    logger.info("Streaming follow-up in session: %.8s", request.session_id)
+    _, conversation_history = await _prepare_followup(db, request.session_id, request.query)
+    
+    async def event_stream():
+        async for event in stream_followup(request.query, conversation_history):
+            if event["type"] == "done":
+                metadata = {**event["metadata"], 'is_followup': True}
+                _queue_write(request.session_id, db.add_message, {
+                    'session_id': request.session_id,
+                    'role': 'assistant',
+                    'content': event["output"],
+                    'citations': [],
+                    'metadata': metadata
+                })
+                event = {"type": "done", "session_id": request.session_id, "metadata": metadata}
+            yield b"data: " + orjson.dumps(event) + b"\n\n"
+        yield b"data: [DONE]\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/api/research/audio-stream")
+async def research_audio_stream(request: AudioResearchRequest):
+    """
+    Research with spoken report, streamed as NDJSON events
+    
+    Synthesis text and TTS segments are interleaved as they are produced,
+    so playback can start before the report is finished.
+    """
+    if not request.query:
+        raise HTTPException(status_code=400, detail="No query provided")
+    
+    logger.info("🎙️ Streaming research + audio: %.80s", request.query)
+    
+    async def event_stream():
+        async for event in stream_research_with_audio(request.query, voice=request.voice):
+            yield orjson.dumps(event) + b"\n"
+    
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
 @app.get("/api/history")
-async def get_history(limit: int = 50):
+async def get_history(limit: int = 50, db: Optional[VettanDatabaseV2] = Depends(get_db)):
     """Get conversation history"""
     try:
-        logger.info(f"📚 Fetching history: limit={limit}")
+        logger.info("📚 Fetching history: limit=%s", limit)
         
-        db = get_database_v2()
         if db and db.is_connected:
-            sessions = db.get_recent_sessions(limit=limit)
+            sessions = await asyncio.to_thread(db.get_recent_sessions, limit=limit)
             
             formatted_sessions = [
                 {
@@ -422,67 +644,63 @@ async def get_history(limit: int = 50):
                 for s in sessions
             ]
             
-            logger.info(f"Retrieved {len(formatted_sessions)} sessions")
+            logger.info("Retrieved %s sessions", len(formatted_sessions))
             return {"sessions": formatted_sessions}
         
         logger.warning("Database not connected")
         return {"sessions": []}
         
     except Exception as e:
-        logger.error(f"History fetch failed: {e}")
+        logger.error("History fetch failed: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/history/{session_id}")
-async def get_session(session_id: str):
+async def get_session(session_id: str, db: Optional[VettanDatabaseV2] = Depends(get_db)):
     """
     Get complete session with FULL message history
     
     CRITICAL: Always returns ALL messages in thread
     """
     try:
-        logger.info("="*60)
-        logger.info(f"GET SESSION: {session_id[:8]}")
-        logger.info("="*60)
+        logger.info(_BANNER)
+        logger.info("GET SESSION: %.8s", session_id)
+        logger.info(_BANNER)
         
-        db = get_database_v2()
         if not db or not db.is_connected:
             raise HTTPException(status_code=503, detail="Database not connected")
         
+        # A just-created session may still be in the write-behind queue
+        await _await_session_writes(session_id)
+        
         # Get session metadata
-        session_data = db.get_session_by_id(session_id)
+        session_data = await asyncio.to_thread(
+            db.get_session_by_id,
+            session_id,
+            ['query', 'report', 'citations', 'metadata']
+        )
         if not session_data:
-            logger.error(f"Session not found: {session_id[:8]}")
+            logger.error("Session not found: %.8s", session_id)
             raise HTTPException(status_code=404, detail="Session not found")
         
-        logger.info(f"Session found: {session_data.get('query', 'N/A')[:50]}")
+        logger.info("Session found: %.50s", session_data.get('query', 'N/A'))
         
         # Get FULL message history
-        messages = db.get_conversation_history(session_id)
+        messages = await asyncio.to_thread(db.get_conversation_history, session_id)
         
         if not messages:
-            logger.warning(f"No messages found for session: {session_id[:8]}")
+            logger.warning("No messages found for session: %.8s", session_id)
             messages = []
         else:
-            logger.info(f"Loaded {len(messages)} messages from database")
-            for i, msg in enumerate(messages, 1):
-                logger.info(f"  {i}. {msg['role']}: {msg['content'][:60]}...")
+            logger.info("Loaded %s messages from database", len(messages))
+            if DEBUG_CONVERSATION and logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Thread: %s", [(msg['role'], msg['content'][:60]) for msg in messages])
         
         # Format messages
-        formatted_messages = [
-            {
-                "id": msg['id'],
-                "role": msg['role'],
-                "content": msg['content'],
-                "citations": msg.get('citations', []),
-                "metadata": msg.get('metadata', {}),
-                "created_at": msg['created_at']
-            }
-            for msg in messages
-        ]
+        formatted_messages = _format_messages(messages)
         
-        logger.info("="*60)
-        logger.info(f"RETURNING {len(formatted_messages)} messages to frontend")
-        logger.info("="*60)
+        logger.info(_BANNER)
+        logger.info("RETURNING %s messages to frontend", len(formatted_messages))
+        logger.info(_BANNER)
         
         return {
             "output": session_data.get("report", ""),
@@ -495,19 +713,18 @@ async def get_session(session_id: str):
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Session fetch failed: {e}")
+        logger.error("Session fetch failed: %s", e)
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.patch("/api/history/{session_id}")
 @app.put("/api/history/{session_id}")
-async def update_session(session_id: str, request: UpdateSessionRequest):
+async def update_session(session_id: str, request: UpdateSessionRequest, db: Optional[VettanDatabaseV2] = Depends(get_db)):
     """Update session (rename/favorite)"""
     try:
-        logger.info(f"✏️ Updating session: {session_id[:8]}")
+        logger.info("✏️ Updating session: %.8s", session_id)
         
-        db = get_database_v2()
         if not db or not db.is_connected:
             raise HTTPException(status_code=503, detail="Database not connected")
         
@@ -520,17 +737,17 @@ async def update_session(session_id: str, request: UpdateSessionRequest):
         update_data = {}
         if new_title:
             update_data['query'] = new_title
-            logger.info(f"New title: {new_title[:50]}")
+            logger.info("New title: %.50s", new_title)
         if is_favorite is not None:
             update_data['is_favorite'] = is_favorite
-            logger.info(f"Favorite: {is_favorite}")
+            logger.info("Favorite: %s", is_favorite)
         
-        success = db.update_session(session_id, update_data)
+        success = await asyncio.to_thread(db.update_session, session_id, update_data)
         
         if not success:
             raise HTTPException(status_code=404, detail="Session not found")
         
-        logger.info(f"Session updated successfully")
+        logger.info("Session updated successfully")
         
         return {
             "success": True,
@@ -542,25 +759,25 @@ async def update_session(session_id: str, request: UpdateSessionRequest):
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Update failed: {e}")
+        logger.error("Update failed: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.delete("/api/history/{session_id}")
-async def delete_session(session_id: str):
+async def delete_session(session_id: str, db: Optional[VettanDatabaseV2] = Depends(get_db)):
     """Delete session and all messages"""
     try:
-        logger.info(f"🗑️ Deleting session: {session_id[:8]}")
+        logger.info("🗑️ Deleting session: %.8s", session_id)
         
-        db = get_database_v2()
         if not db or not db.is_connected:
             raise HTTPException(status_code=503, detail="Database not connected")
         
-        success = db.delete_session(session_id)
+        _evict_response(session_id)
+        success = await asyncio.to_thread(db.delete_session, session_id)
         
         if not success:
             raise HTTPException(status_code=404, detail="Session not found")
         
-        logger.info(f"Session deleted successfully")
+        logger.info("Session deleted successfully")
         
         return {
             "success": True,
@@ -571,13 +788,13 @@ async def delete_session(session_id: str):
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Delete failed: {e}")
+        logger.error("Delete failed: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 if __name__ == "__main__":
     import uvicorn
-    logger.info("="*60)
+    logger.info(_BANNER)
     logger.info("VETTAN AI BACKEND v5.0.0 STARTING")
-    logger.info("="*60)
+    logger.info(_BANNER)
     port = int(os.environ.get("PORT", 8000))
     uvicorn.run(app, host="0.0.0.0", port=port, log_level="info")
\ No newline at end of file
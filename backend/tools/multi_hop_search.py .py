@@ -2,8 +2,9 @@
 Multi-hop search with iterative refinement
 """
 
-from src.tools.search import search_web
+from src.tools.search import search_tool_instance
 from typing import List, Dict
+import asyncio
 
 
 class MultiHopSearch:
@@ -12,33 +13,36 @@ class MultiHopSearch:
     def __init__(self, max_hops: int = 3):
         self.max_hops = max_hops
     
-    def search_with_refinement(self, query: str) -> List[Dict]:
+    async def search_with_refinement(self, query: str) -> List[Dict]:
         """
         Perform multi-hop search:
         1. Initial broad search
         2. Analyze results for gaps
         3. Targeted follow-up searches
         4. Rank and return best sources
-        """
-        all_results = []
-        
-        # Hop 1: Broad search
-        initial_results = search_web.invoke(f"{query} comprehensive overview")
-        all_results.append(('initial', initial_results))
         
-        # Hop 2: Academic/authoritative sources
-        academic_results = search_web.invoke(f"{query} research paper academic study")
-        all_results.append(('academic', academic_results))
+        The hops are independent, so they run concurrently (wall time is the
+        slowest hop, not the sum).
+        """
+        hops = [
+            ('initial', f"{query} comprehensive overview"),  # Broad search
+            ('academic', f"{query} research paper academic study"),  # Authoritative sources
+            ('recent', f"{query} 2024 2025 latest developments")  # Recent developments
+        ][:self.max_hops]
         
-        # Hop 3: Recent developments
-        recent_results = search_web.invoke(f"{query} 2024 2025 latest developments")
-        all_results.append(('recent', recent_results))
+        results = await asyncio.gather(*(self._asearch(q) for _, q in hops))
+        all_results = [(label, result) for (label, _), result in zip(hops, results)]
         
         # Rank by source quality
         ranked = self._rank_sources(all_results)
         
         return ranked[:10]  # Top 10 sources
     
+    @staticmethod
+    async def _asearch(query: str) -> str:
+        """Tavily search off the event loop (SearchTool shares a sync httpx client)"""
+        return await asyncio.to_thread(search_tool_instance.search, query, 10)
+    
     def _rank_sources(self, results: List) -> List[Dict]:
         """
         Rank sources by:
@@ -4,58 +4,229 @@ Web scraper with URL cleaning
 """
 
 from langchain.tools import tool
-import requests
-from bs4 import BeautifulSoup
+import httpx
+from lxml import etree, html as lxml_html
+from selectolax.parser import HTMLParser
+from cachetools import TTLCache
+from diskcache import Cache
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import asyncio
+import atexit
+import orjson
+import os
+import re
+import threading
 import time
 
+# Boilerplate elements dropped before text extraction
+_STRIP_TAGS = ['script', 'style', 'nav', 'footer', 'header', 'aside']
+_STRIP_XPATH = etree.XPath('|'.join(f'//{tag}' for tag in _STRIP_TAGS))  # One pass, for the lxml fallback
+_WORD_RE = re.compile(r'\S+')
+
+_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
+}
+# Scraped pages per (normalized URL, max_words)
+SCRAPE_CACHE_SIZE = 512
+SCRAPE_CACHE_TTL = 3600
+_TRACKING_PARAMS = {'fbclid', 'gclid', 'mc_cid', 'mc_eid', 'ref'}
+
+# Decoded HTML read per page; max_words of text is always well inside this,
+# so the rest of a long page is never downloaded or decompressed
+MAX_PAGE_BYTES = 512_000
+
+# Validators (ETag / Last-Modified) + rendered text per page, on disk so pages
+# that left the in-memory cache (or a restart) are revalidated with a
+# conditional GET; a 304 skips the download and the parse
+SCRAPE_VALIDATOR_TTL = 7 * 24 * 3600
+_validators = Cache(
+    os.path.join(os.getenv("VETTAN_CACHE_DIR", "/tmp/vettan"), "scraper"),
+    size_limit=256 << 20,
+    eviction_policy="least-recently-used"
+)
+atexit.register(_validators.close)
+
+# Pages fetched at once by scrape_many / scrape_webpages
+MAX_PARALLEL_SCRAPES = 8
+_scrape_sem = asyncio.Semaphore(MAX_PARALLEL_SCRAPES)
+_URL_SPLIT_RE = re.compile(r'[\s,]+')
+
+_LIMITS = httpx.Limits(max_keepalive_connections=64, max_connections=128)
+
+# Shared keep-alive pools (HTTP/2 where the site supports it) - repeat scrapes
+# of a host reuse the TLS connection. httpx sends Accept-Encoding gzip/deflate
+# (+ br with the brotli extra) and decodes as the body streams in
+_http = httpx.Client(
+    http2=True,
+    headers=_HEADERS,
+    follow_redirects=True,
+    limits=_LIMITS,
+    timeout=10.0
+)
+_ahttp = httpx.AsyncClient(
+    http2=True,
+    headers=_HEADERS,
+    follow_redirects=True,
+    limits=_LIMITS,
+    timeout=10.0
+)
+
 
 class WebScraper:
     """Web scraping with URL validation"""
     
     def __init__(self):
         self.scrape_count = 0
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
-        })
+        self.session = _http
+        self._cache: TTLCache = TTLCache(maxsize=SCRAPE_CACHE_SIZE, ttl=SCRAPE_CACHE_TTL)
+        self._cache_lock = threading.Lock()
     
     def scrape(self, url: str, max_words: int = 800) -> str:
         """Scrape webpage content"""
+        cached = self._cached(url, max_words)
+        if cached:
+            return cached
+        
         try:
-            self.scrape_count += 1
-            
-            # CRITICAL: Strip whitespace and newlines from URL
-            url = url.strip().rstrip('/').replace('\n', '').replace('\r', '')
-            
-            print(f"🌐 Scraping: {url[:80]}...")
-            
-            # Removed: artificial 1s delay was adding 5-15s total per research query
-            
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'lxml')
-            
-            for element in soup(['script', 'style', 'nav', 'footer', 'header', 'aside']):
-                element.decompose()
+            url = self._start(url)
+            headers, stored = self._conditional(url, max_words)
+            with self.session.stream('GET', url, headers=headers) as response:
+                if stored and response.status_code == 304:
+                    return self._store(url, max_words, stored['text'])
+                response.raise_for_status()
+                html = self._read_capped(response.iter_bytes())
+            return self._remember(url, max_words, response, self._render(url, html, max_words))
             
-            text = soup.get_text(separator='\n', strip=True)
-            
-            lines = [line.strip() for line in text.splitlines() if line.strip()]
-            text = '\n'.join(lines)
-            
-            words = text.split()[:max_words]
-            result = ' '.join(words)
-            
-            return f"Content from {url}:\n\n{result}"
+        except httpx.TimeoutException:
+            return f"Error: Timeout while scraping {url}"
+        except httpx.HTTPError as e:
+            return f"Error: Failed to scrape {url} - {str(e)}"
+        except Exception as e:
+            return f"Error: Unexpected error scraping {url} - {str(e)}"
+    
+    async def ascrape(self, url: str, max_words: int = 800) -> str:
+        """Async scrape (for asyncio.gather over several URLs)"""
+        cached = self._cached(url, max_words)
+        if cached:
+            return cached
+        
+        try:
+            url = self._start(url)
+            headers, stored = self._conditional(url, max_words)
+            async with _ahttp.stream('GET', url, headers=headers) as response:
+                if stored and response.status_code == 304:
+                    return self._store(url, max_words, stored['text'])
+                response.raise_for_status()
+                html = bytearray()
+                async for chunk in response.aiter_bytes():
+                    html += chunk
+                    if len(html) >= MAX_PAGE_BYTES:
+                        break
+            return self._remember(url, max_words, response, self._render(url, bytes(html[:MAX_PAGE_BYTES]), max_words))
             
-        except requests.Timeout:
+        except httpx.TimeoutException:
             return f"Error: Timeout while scraping {url}"
-        except requests.RequestException as e:
+        except httpx.HTTPError as e:
             return f"Error: Failed to scrape {url} - {str(e)}"
         except Exception as e:
             return f"Error: Unexpected error scraping {url} - {str(e)}"
     
+    @staticmethod
+    def _read_capped(chunks: Iterator[bytes]) -> bytes:
+        """First MAX_PAGE_BYTES of a decoded body (stops reading once reached)"""
+        html = bytearray()
+        for chunk in chunks:
+            html += chunk
+            if len(html) >= MAX_PAGE_BYTES:
+                break
+        return bytes(html[:MAX_PAGE_BYTES])
+    
+    @staticmethod
+    def _cache_key(url: str, max_words: int) -> str:
+        """URL without fragment, tracking params or trailing slash"""
+        parts = urlsplit(url.strip())
+        query = urlencode([
+            (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+            if not (k.lower().startswith('utm_') or k.lower() in _TRACKING_PARAMS)
+        ])
+        path = parts.path.rstrip('/')
+        return f"{urlunsplit((parts.scheme, parts.netloc.lower(), path, query, ''))}|{max_words}"
+    
+    def _cached(self, url: str, max_words: int) -> str:
+        """Cached page text ('' on miss)"""
+        with self._cache_lock:
+            return self._cache.get(self._cache_key(url, max_words), '')
+    
+    def _store(self, url: str, max_words: int, content: str) -> str:
+        """Cache a successful scrape and return it"""
+        with self._cache_lock:
+            self._cache[self._cache_key(url, max_words)] = content
+        return content
+    
+    def _conditional(self, url: str, max_words: int) -> Tuple[Dict[str, str], Optional[Dict[str, str]]]:
+        """Conditional-GET headers for a previously scraped page, and its stored entry"""
+        stored = _validators.get(self._cache_key(url, max_words))
+        if not stored:
+            return {}, None
+        
+        headers = {}
+        if stored.get('etag'):
+            headers['If-None-Match'] = stored['etag']
+        if stored.get('last_modified'):
+            headers['If-Modified-Since'] = stored['last_modified']
+        return headers, stored
+    
+    def _remember(self, url: str, max_words: int, response: httpx.Response, content: str) -> str:
+        """Cache a fresh scrape, keeping its validators on disk when the site sends any"""
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if etag or last_modified:
+            _validators.set(
+                self._cache_key(url, max_words),
+                {'etag': etag, 'last_modified': last_modified, 'text': content},
+                expire=SCRAPE_VALIDATOR_TTL
+            )
+        return self._store(url, max_words, content)
+    
+    def _start(self, url: str) -> str:
+        """Count the scrape and clean the URL"""
+        self.scrape_count += 1
+        
+        # CRITICAL: Strip whitespace and newlines from URL
+        url = url.strip().rstrip('/').replace('\n', '').replace('\r', '')
+        
+        print(f"🌐 Scraping: {url[:80]}...")
+        
+        # Removed: artificial 1s delay was adding 5-15s total per research query
+        return url
+    
+    def _render(self, url: str, html: bytes, max_words: int) -> str:
+        """Format the first max_words words of a page for the agent"""
+        text = self._extract_text(html)
+        
+        # Only the first max_words words are ever materialized
+        words = islice((m.group() for m in _WORD_RE.finditer(text)), max_words)
+        result = ' '.join(words)
+        
+        return f"Content from {url}:\n\n{result}"
+    
+    @staticmethod
+    def _extract_text(html: bytes) -> str:
+        """Visible page text (selectolax C parser, lxml fallback)"""
+        try:
+            tree = HTMLParser(html)
+            tree.strip_tags(_STRIP_TAGS)
+            root = tree.body or tree.root
+            return root.text(separator='\n', strip=True) if root else ''
+        except Exception:
+            tree = lxml_html.fromstring(html)
+            for element in _STRIP_XPATH(tree):
+                element.drop_tree()  # Keeps the tail text that follows the element
+            return '\n'.join(text.strip() for text in tree.itertext() if text.strip())
+    
     def get_scrape_count(self) -> int:
         """Return scrape count"""
         return self.scrape_count
@@ -64,6 +235,33 @@ class WebScraper:
 scraper_instance = WebScraper()
 
 
+async def scrape_many(urls: List[str], max_words: int = 800) -> List[str]:
+    """Scrape several URLs concurrently (at most MAX_PARALLEL_SCRAPES in flight), in input order"""
+    async def _one(url: str) -> str:
+        async with _scrape_sem:
+            return await scraper_instance.ascrape(url, max_words)
+    
+    return await asyncio.gather(*(_one(url) for url in urls))
+
+
+def _parse_urls(urls: str) -> List[str]:
+    """URLs from a JSON list or a comma/whitespace separated string"""
+    urls = urls.strip()
+    if urls.startswith('['):
+        try:
+            return [str(url).strip() for url in orjson.loads(urls) if str(url).strip()]
+        except orjson.JSONDecodeError:
+            pass
+    candidates = (url.strip('\'"') for url in _URL_SPLIT_RE.split(urls.strip('[]')))
+    return [url for url in candidates if url]
+
+
+async def close_scraper_clients() -> None:
+    """Close the shared HTTP pools (FastAPI shutdown)"""
+    _http.close()
+    await _ahttp.aclose()
+
+
 @tool
 def scrape_webpage(url: str) -> str:
     """
@@ -86,4 +284,29 @@ def scrape_webpage(url: str) -> str:
     return scraper_instance.scrape(url)
 
 
-__all__ = ['scrape_webpage', 'WebScraper', 'scraper_instance']
+@tool
+def scrape_webpages(urls: str) -> str:
+    """
+    Scrape several webpages at once (faster than one scrape_webpage call per URL).
+    Use after search_web when 2-3 results look relevant.
+    
+    Args:
+        urls: URLs separated by commas, or a JSON list of URLs
+    
+    Returns:
+        Extracted text content of each page, in the order given
+    """
+    url_list = _parse_urls(urls)
+    invalid = [url for url in url_list if not url.startswith(('http://', 'https://'))]
+    if not url_list or invalid:
+        return f"Error: Invalid URL format: {', '.join(invalid) or urls}"
+    
+    # The agent calls tools synchronously from a worker thread; the sync pool
+    # avoids running the shared AsyncClient on a second event loop
+    with ThreadPoolExecutor(max_workers=min(MAX_PARALLEL_SCRAPES, len(url_list))) as executor:
+        pages = list(executor.map(scraper_instance.scrape, url_list))
+    
+    return "\n\n".join(pages)
+
+
+__all__ = ['scrape_webpage', 'scrape_webpages', 'scrape_many', 'WebScraper', 'scraper_instance', 'close_scraper_clients']
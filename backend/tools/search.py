@@ -4,9 +4,29 @@ Provides LLM-optimized web search capability for the research agent.
 """
 
 from langchain.tools import tool
-from tavily import TavilyClient
+import httpx
+import orjson
+from cachetools import TTLCache
+import hashlib
 import os
-from typing import Dict, List
+import threading
+from typing import Any, Dict, List
+
+from utils.retry import with_retry
+
+# Formatted results per (normalized query, max_results) - agent hops and
+# follow-ups repeat searches verbatim
+SEARCH_CACHE_SIZE = 2048
+SEARCH_CACHE_TTL = 3600
+
+# One keep-alive pool for Tavily REST calls, shared by every SearchTool
+# (the SDK client opens a new connection per search)
+_tavily_http = httpx.Client(
+    base_url="https://api.tavily.com",
+    http2=True,
+    timeout=httpx.Timeout(30.0, connect=5.0),
+    limits=httpx.Limits(max_keepalive_connections=16, max_connections=32)
+)
 
 
 class SearchTool:
@@ -23,8 +43,22 @@ class SearchTool:
         if not self.api_key:
             raise ValueError("TAVILY_API_KEY not found in environment")
         
-        self.client = TavilyClient(api_key=self.api_key)
+        self.client = _tavily_http
         self.search_count = 0
+        self._cache: TTLCache = TTLCache(maxsize=SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TTL)
+        self._cache_lock = threading.Lock()
+    
+    @with_retry
+    def _post_search(self, query: str, max_results: int) -> Dict[str, Any]:
+        """POST /search (retried on 429/5xx/transport errors)"""
+        response = self.client.post("/search", json={
+            "api_key": self.api_key,
+            "query": query,
+            "max_results": max_results,
+            "search_depth": "basic"
+        })
+        response.raise_for_status()
+        return orjson.loads(response.content)
     
     def search(self, query: str, max_results: int = 5) -> str:
         """
@@ -37,17 +71,20 @@ class SearchTool:
         Returns:
             Formatted search results as string
         """
+        key = hashlib.blake2b(
+            f"{' '.join(query.lower().split())}|{max_results}".encode(),
+            digest_size=16
+        ).hexdigest()
+        with self._cache_lock:
+            cached = self._cache.get(key)
+        if cached:
+            return cached
+        
         try:
             self.search_count += 1
             
             
-            results = self.client.search(
-                query=query,
-                max_results=max_results,
-                search_depth="basic",  
-                include_domains=[],  
-                exclude_domains=[]
-            )
+            results = self._post_search(query, max_results)
             
             
             formatted_results = []
@@ -63,7 +100,12 @@ class SearchTool:
                     )
             
             output = "\n---\n".join(formatted_results)
-            return output if output else "No results found."
+            if not output:
+                return "No results found."
+            
+            with self._cache_lock:
+                self._cache[key] = output
+            return output
             
         except Exception as e:
             return f"Search error: {str(e)}"
@@ -3,6 +3,10 @@
 Rank sources by authority and relevance
 """
 
+from typing import Dict, List
+from urllib.parse import urlsplit
+
+
 class SourceRanker:
     """
     Ranks sources using multiple signals:
@@ -28,6 +32,10 @@ class SourceRanker:
         'reddit.com': 2
     }
     
+    # Host suffix -> score ('.edu' matches any *.edu host, 'mit.edu' the
+    # domain and its subdomains); a host is scored by dict lookups on its suffixes
+    _SUFFIX_SCORES = {domain.lstrip('.'): score for domain, score in DOMAIN_SCORES.items()}
+    
     def rank_sources(self, sources: List[Dict], query: str) -> List[Dict]:
         """
         Rank sources by quality score
@@ -54,8 +62,13 @@ class SourceRanker:
         return ranked
     
     def _get_domain_score(self, url: str) -> float:
-        """Score based on domain authority"""
-        for domain, score in self.DOMAIN_SCORES.items():
-            if domain in url:
-                return score / 10.0  # Normalize to 0-1
+        """Score based on domain authority (best match among the host's suffixes)"""
+        labels = (urlsplit(url).hostname or '').split('.')
+        scores = [
+            self._SUFFIX_SCORES[suffix]
+            for suffix in ('.'.join(labels[i:]) for i in range(len(labels)))
+            if suffix in self._SUFFIX_SCORES
+        ]
+        if scores:
+            return max(scores) / 10.0  # Normalize to 0-1
         return 0.5  # Default
\ No newline at end of file
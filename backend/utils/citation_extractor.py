@@ -4,7 +4,22 @@ Extract and format citations from agent research
 
 import re
 from typing import List, Dict
-from urllib.parse import urlparse
+
+try:
+    import re2 as _url_re_engine  # Optional (google-re2): linear-time DFA matching
+except ImportError:
+    _url_re_engine = re
+
+# Compiled once; extract_urls runs over every agent observation
+_URL_RE = _url_re_engine.compile(r'https?://[^\s\)\]\}]+')
+_NETLOC_END_RE = re.compile(r'[/?#]')
+
+
+def _domain(url: str) -> str:
+    """netloc of a URL matched by _URL_RE (same result as urlparse(url).netloc, by slicing)"""
+    start = url.find('://') + 3
+    end = _NETLOC_END_RE.search(url, start)
+    return url[start:end.start()] if end else url[start:]
 
 
 class CitationExtractor:
@@ -21,18 +36,12 @@ class CitationExtractor:
         Returns:
             List of unique URLs
         """
-        url_pattern = r'https?://[^\s\)\]\}]+'
-        urls = re.findall(url_pattern, text)
-        
-        # Deduplicate while preserving order
-        seen = set()
-        unique_urls = []
-        for url in urls:
-            if url not in seen:
-                seen.add(url)
-                unique_urls.append(url)
+        # Cheap C substring reject before running the regex
+        if 'http' not in text:
+            return []
         
-        return unique_urls
+        # Deduplicate while preserving order (dict keys keep insertion order)
+        return list(dict.fromkeys(_URL_RE.findall(text)))
     
     @staticmethod
     def extract_from_agent_steps(intermediate_steps: List) -> List[Dict[str, str]]:
@@ -49,23 +58,23 @@ class CitationExtractor:
         seen_urls = set()
         
         for action, observation in intermediate_steps:
-            # Extract URLs from observations
-            urls = CitationExtractor.extract_urls(str(observation))
+            # Single pass over the observation; only new URLs allocate anything
+            text = observation if isinstance(observation, str) else str(observation)
+            if 'http' not in text:
+                continue
             
-            for url in urls:
-                if url not in seen_urls:
-                    seen_urls.add(url)
-                    
-                    # Parse domain for better display
-                    parsed = urlparse(url)
-                    domain = parsed.netloc
-                    
-                    citations.append({
-                        'url': url,
-                        'domain': domain,
-                        'tool': action.tool if hasattr(action, 'tool') else 'unknown',
-                        'query': str(action.tool_input)[:100] if hasattr(action, 'tool_input') else ''
-                    })
+            for match in _URL_RE.finditer(text):
+                url = match.group()
+                if url in seen_urls:
+                    continue
+                seen_urls.add(url)
+                
+                citations.append({
+                    'url': url,
+                    'domain': _domain(url),  # For display
+                    'tool': action.tool if hasattr(action, 'tool') else 'unknown',
+                    'query': str(action.tool_input)[:100] if hasattr(action, 'tool_input') else ''
+                })
         
         return citations
     
@@ -83,8 +92,7 @@ class CitationExtractor:
         if not citations:
             return "No external sources cited."
         
-        formatted = []
-        for i, cite in enumerate(citations, 1):
-            formatted.append(f"{i}. [{cite['domain']}]({cite['url']})")
-        
-        return "\n".join(formatted)
\ No newline at end of file
+        return "\n".join(
+            f"{i}. [{cite['domain']}]({cite['url']})"
+            for i, cite in enumerate(citations, 1)
+        )
\ No newline at end of file
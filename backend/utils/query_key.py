@@ -0,0 +1,70 @@
+"""
+Temporal/parameter-aware cache keys for research queries
+Embeddings collapse dates and numbers, so these go into the key explicitly
+"""
+
+import re
+from datetime import date, timedelta
+from typing import List, Optional, Tuple
+
+# Cache freshness (seconds)
+DEFAULT_CACHE_TTL = 30 * 24 * 3600
+MIN_CACHE_TTL = 3600  # Below this the query is too time-sensitive to cache
+
+_TEMPORAL_RE = re.compile(
+    r'\b(?:(today|tonight|right now|currently)|(yesterday)|(this week)|(last week)'
+    r'|(this month)|(last month)|(?:last|past) (\d{1,3}) days|(\d{4}-\d{2}-\d{2}))\b',
+    re.IGNORECASE
+)
+_CODE_RE = re.compile(r'\b(?=[A-Za-z-]*\d)(?=[\d-]*[A-Za-z])[A-Za-z\d-]{2,}\b')  # RTX4090, gpt-4o
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_TICKER_RE = re.compile(r'\$[A-Za-z]{1,5}\b|\b[A-Z]{2,5}\b')
+
+
+def _resolve_window(match: re.Match, today: date) -> Tuple[str, int]:
+    """Resolve a temporal expression to an absolute window and TTL"""
+    now_word, yesterday, this_week, last_week, this_month, last_month, n_days, iso_day = match.groups()
+    
+    if now_word:
+        return f"{today}..{today}", 15 * 60
+    if yesterday:
+        day = today - timedelta(days=1)
+        return f"{day}..{day}", 7 * 24 * 3600
+    if this_week:
+        start = today - timedelta(days=today.weekday())
+        return f"{start}..{today}", 6 * 3600
+    if last_week:
+        start = today - timedelta(days=today.weekday() + 7)
+        return f"{start}..{start + timedelta(days=6)}", 7 * 24 * 3600
+    if this_month:
+        return f"{today.replace(day=1)}..{today}", 6 * 3600
+    if last_month:
+        end = today.replace(day=1) - timedelta(days=1)
+        return f"{end.replace(day=1)}..{end}", 30 * 24 * 3600
+    if n_days:
+        return f"{today - timedelta(days=int(n_days))}..{today}", 6 * 3600
+    return f"{iso_day}..{iso_day}", DEFAULT_CACHE_TTL
+
+
+def cache_key(query: str) -> Tuple[str, Optional[str], List[str], int]:
+    """
+    Build a temporal/parameter-aware cache key
+    
+    Returns:
+        (normalized_text, resolved_window, param_tokens, ttl_seconds)
+    """
+    normalized_text = " ".join(query.lower().split())
+    window: Optional[str] = None
+    ttl = DEFAULT_CACHE_TTL
+    
+    temporal = _TEMPORAL_RE.search(query)
+    if temporal:
+        window, ttl = _resolve_window(temporal, date.today())
+    
+    # Numbers/codes inside temporal expressions are covered by the window
+    remainder = _TEMPORAL_RE.sub(' ', query)
+    params = set(m.lower() for m in _CODE_RE.findall(remainder))
+    params.update(_NUMBER_RE.findall(remainder))
+    params.update(m.lstrip('$').lower() for m in _TICKER_RE.findall(remainder))
+    
+    return normalized_text, window, sorted(params), ttl
@@ -0,0 +1,33 @@
+"""
+Retry policy for OpenAI / Tavily network calls
+Exponential backoff with jitter on rate limits, timeouts and 5xx only
+"""
+
+import httpx
+from openai import APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential_jitter
+
+_TRANSIENT_ERRORS = (
+    RateLimitError,
+    APITimeoutError,
+    APIConnectionError,
+    InternalServerError,
+    httpx.TransportError
+)
+
+
+def is_transient(error: BaseException) -> bool:
+    """True for failures worth retrying (429, 5xx, timeouts, dropped connections)"""
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return status == 429 or status >= 500
+    return isinstance(error, _TRANSIENT_ERRORS)
+
+
+# Works on both sync functions and coroutines; the last error is re-raised
+with_retry = retry(
+    retry=retry_if_exception(is_transient),
+    stop=stop_after_attempt(4),
+    wait=wait_exponential_jitter(initial=0.5, max=5),
+    reraise=True
+)
@@ -0,0 +1,151 @@
+"""
+In-process semantic cache for LLM completions
+Near-duplicate prompts (by embedding cosine similarity) reuse a stored completion
+"""
+
+import logging
+import os
+import threading
+import time
+import numpy as np
+import orjson
+from typing import Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticCache:
+    """Cosine-similarity lookup over normalized embeddings (exact, brute force)"""
+    
+    def __init__(
+        self,
+        name: str,
+        threshold: float = 0.92,
+        max_entries: int = 2000,
+        cache_dir: Optional[str] = None,
+        ttl: Optional[float] = None
+    ):
+        """
+        Initialize cache shard
+        
+        Args:
+            name: Shard name (also the persistence file prefix)
+            threshold: Minimum cosine similarity for a hit
+            max_entries: Oldest entries are evicted beyond this
+            cache_dir: Directory to persist the shard in (None = memory only)
+            ttl: Default entry lifetime in seconds (None = no expiry)
+        """
+        self.name = name
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self._vectors: Optional[np.ndarray] = None  # (n, dim) float32, unit rows
+        self._entries: List[Tuple[str, Any, Optional[float]]] = []  # (context_key, value, expires_at), row-aligned
+        self._lock = threading.Lock()
+        
+        if cache_dir:
+            self._load()
+    
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        """Unit-length float32 vector so dot product == cosine similarity"""
+        vec = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+    
+    def get(self, embedding: List[float], context_key: str = "") -> Optional[Any]:
+        """
+        Return the stored value for the most similar entry above threshold
+        
+        Args:
+            embedding: Query embedding
+            context_key: Must match exactly (e.g. hash of source URLs)
+        """
+        vec = self._normalize(embedding)
+        now = time.time()
+        
+        with self._lock:
+            if self._vectors is None or not len(self._entries):
+                return None
+            
+            scores = self._vectors @ vec
+            for row in np.argsort(scores)[::-1]:
+                if scores[row] < self.threshold:
+                    break
+                key, value, expires_at = self._entries[row]
+                if key == context_key and (expires_at is None or expires_at > now):
+                    logger.info(f"🧠 Semantic cache hit [{self.name}] (similarity {scores[row]:.3f})")
+                    return value
+        
+        return None
+    
+    def put(
+        self,
+        embedding: List[float],
+        value: Any,
+        context_key: str = "",
+        ttl: Optional[float] = None
+    ) -> None:
+        """Store a value (evicts the oldest entry when full; ttl overrides the shard default)"""
+        vec = self._normalize(embedding)[np.newaxis, :]
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.time() + ttl if ttl is not None else None
+        
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = vec
+            else:
+                self._vectors = np.vstack([self._vectors, vec])
+            self._entries.append((context_key, value, expires_at))
+            
+            overflow = len(self._entries) - self.max_entries
+            if overflow > 0:
+                self._vectors = self._vectors[overflow:]
+                del self._entries[:overflow]
+    
+    def _paths(self) -> Tuple[str, str]:
+        base = os.path.join(self.cache_dir, self.name)
+        return f"{base}.npy", f"{base}.json"
+    
+    def _load(self) -> None:
+        """Reload a persisted shard (missing or corrupt files start empty, expired entries are dropped)"""
+        vectors_path, entries_path = self._paths()
+        if not (os.path.exists(vectors_path) and os.path.exists(entries_path)):
+            return
+        
+        try:
+            vectors = np.load(vectors_path)
+            with open(entries_path, "rb") as f:
+                entries = [tuple(e) for e in orjson.loads(f.read())]
+            if len(vectors) == len(entries):
+                # Entries saved before expiry existed have no expires_at - drop them too
+                now = time.time()
+                keep = [
+                    row for row, entry in enumerate(entries)
+                    if len(entry) == 3 and (entry[2] is None or entry[2] > now)
+                ]
+                self._vectors = vectors[keep] if keep else None
+                self._entries = [entries[row] for row in keep]
+                logger.info(f"Loaded semantic cache [{self.name}]: {len(self._entries)} entries")
+        except Exception as e:
+            logger.warning(f"Semantic cache [{self.name}] load failed: {e}")
+    
+    def save(self) -> None:
+        """Persist the shard to cache_dir (no-op when memory only)"""
+        if not self.cache_dir:
+            return
+        
+        with self._lock:
+            if self._vectors is None:
+                return
+            vectors, entries = self._vectors, list(self._entries)
+        
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            vectors_path, entries_path = self._paths()
+            np.save(vectors_path, vectors)
+            with open(entries_path, "wb") as f:
+                f.write(orjson.dumps(entries))
+        except Exception as e:
+            logger.warning(f"Semantic cache [{self.name}] save failed: {e}")
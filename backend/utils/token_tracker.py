@@ -2,9 +2,42 @@
 Token usage tracking and cost estimation
 """
 
+import functools
+import hashlib
+import logging
+import os
+import threading
 import tiktoken
+from cachetools import LRUCache
 from typing import Dict
 
+# Token counts per (model, text) - agent prompts re-count the same system
+# prompt and prior turns; long texts are keyed by digest, not retained
+TOKEN_COUNT_CACHE_SIZE = 4096
+LONG_TEXT_CHARS = 2048
+
+_count_cache: LRUCache = LRUCache(maxsize=TOKEN_COUNT_CACHE_SIZE)
+_count_lock = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
+# TOKENIZER_BACKEND=bpe_openai counts with the bpe-openai Rust crate
+# (tiktoken-compatible API, linear worst case on long repeated-character runs
+# that make tiktoken's BPE merge quadratic); optional, tiktoken otherwise
+TOKENIZER_BACKEND = os.getenv("TOKENIZER_BACKEND", "tiktoken").lower()
+
+
+@functools.lru_cache(maxsize=8)
+def _load_encoding(model: str):
+    """Encoding for a model from the configured backend (tiktoken fallback), shared by all trackers"""
+    if TOKENIZER_BACKEND == "bpe_openai":
+        try:
+            import bpe_openai
+            return bpe_openai.encoding_for_model(model)
+        except Exception as e:  # Not installed / model not supported
+            logger.warning("bpe_openai unavailable for %s (%s), using tiktoken", model, e)
+    return tiktoken.encoding_for_model(model)
+
 
 class TokenTracker:
     """Track token usage and estimate costs"""
@@ -29,21 +62,55 @@ class TokenTracker:
             model: Model name for pricing
         """
         self.model = model
-        self.encoding = tiktoken.encoding_for_model(model)
+        
+        # Per-token rates resolved once (get_cost is two multiplies)
+        pricing = self.PRICING.get(model, self.PRICING['gpt-4o-mini'])
+        self._in_rate = pricing['input'] / 1_000_000
+        self._out_rate = pricing['output'] / 1_000_000
         self.total_input_tokens = 0
         self.total_output_tokens = 0
+        self._lock = threading.Lock()  # Shared across concurrent research threads
+    
+    @property
+    def encoding(self):
+        """BPE table, loaded on first count (usage/cost tracking never needs it)"""
+        return _load_encoding(self.model)
     
     def count_tokens(self, text: str) -> int:
-        """Count tokens in text"""
-        return len(self.encoding.encode(text))
+        """Count tokens in text (plain text: no special-token scan), memoized"""
+        if len(text) > LONG_TEXT_CHARS:
+            key = (self.model, hashlib.blake2b(text.encode(), digest_size=16).digest())
+        else:
+            key = (self.model, text)
+        with _count_lock:
+            count = _count_cache.get(key)
+        if count is None:
+            count = len(self.encoding.encode_ordinary(text))
+            with _count_lock:
+                _count_cache[key] = count
+        return count
     
     def add_input_tokens(self, count: int):
         """Add input token count"""
-        self.total_input_tokens += count
+        with self._lock:
+            self.total_input_tokens += count
     
     def add_output_tokens(self, count: int):
         """Add output token count"""
-        self.total_output_tokens += count
+        with self._lock:
+            self.total_output_tokens += count
+    
+    def add_usage(self, input_tokens: int = 0, output_tokens: int = 0):
+        """
+        Apply accumulated usage in one locked update
+        
+        For per-chunk accounting in a stream, sum chunk counts in locals and
+        call this once at the end (or bind `add = tracker.add_usage` outside
+        the loop) rather than calling add_input_tokens/add_output_tokens per chunk.
+        """
+        with self._lock:
+            self.total_input_tokens += input_tokens
+            self.total_output_tokens += output_tokens
     
     def get_cost(self) -> Dict[str, float]:
         """
@@ -52,30 +119,40 @@ class TokenTracker:
         Returns:
             Dictionary with input, output, and total costs
         """
-        pricing = self.PRICING.get(self.model, self.PRICING['gpt-4o-mini'])
+        # Consistent snapshot of both counters
+        with self._lock:
+            input_tokens = self.total_input_tokens
+            output_tokens = self.total_output_tokens
         
-        input_cost = (self.total_input_tokens / 1_000_000) * pricing['input']
-        output_cost = (self.total_output_tokens / 1_000_000) * pricing['output']
+        input_cost = input_tokens * self._in_rate
+        output_cost = output_tokens * self._out_rate
         
         return {
             'input_cost': input_cost,
             'output_cost': output_cost,
             'total_cost': input_cost + output_cost,
-            'input_tokens': self.total_input_tokens,
-            'output_tokens': self.total_output_tokens,
-            'total_tokens': self.total_input_tokens + self.total_output_tokens
+            'input_tokens': input_tokens,
+            'output_tokens': output_tokens,
+            'total_tokens': input_tokens + output_tokens
         }
     
     def reset(self):
         """Reset counters"""
-        self.total_input_tokens = 0
-        self.total_output_tokens = 0
+        with self._lock:
+            self.total_input_tokens = 0
+            self.total_output_tokens = 0
 
 
-# Global tracker instance
-tracker = TokenTracker()
+# Global tracker instance (built on first use)
+_tracker = None
+_tracker_lock = threading.Lock()
 
 
 def get_tracker() -> TokenTracker:
     """Get global token tracker instance"""
-    return tracker
\ No newline at end of file
+    global _tracker
+    if _tracker is None:
+        with _tracker_lock:
+            if _tracker is None:
+                _tracker = TokenTracker()
+    return _tracker
\ No newline at end of file
@@ -90,18 +90,12 @@ export function AudioPlayer({ text }: AudioPlayerProps) {
       const response = await axios.post(`${API_URL}/api/audio`, {
         text,
         voice: selectedVoice
-      })
+      }, { responseType: 'blob' })
       
-      const audioData = atob(response.data.audio)
-      const audioArray = new Uint8Array(audioData.length)
-      for (let i = 0; i < audioData.length; i++) {
-        audioArray[i] = audioData.charCodeAt(i)
-      }
-      const audioBlob = new Blob([audioArray], { type: 'audio/mpeg' })
-      const url = URL.createObjectURL(audioBlob)
+      const url = URL.createObjectURL(response.data)
       
       setAudioUrl(url)
-      setCost(response.data.cost)
+      setCost(parseFloat(response.headers['x-audio-cost']) || 0)
       
     } catch (error) {
       console.error('Audio generation failed:', error)